@@ -2,3 +2,17 @@ from django.contrib import admin
 from .models import *
 
 # Register your models here.
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    # Jobs are created by uploads and moved on by the worker; the admin only
+    # shows how they went.
+    list_display = ('center', 'kind', 'status', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    exclude = ('upload',)
+    readonly_fields = ('center', 'kind', 'status', 'report', 'error', 'created_at', 'started_at', 'finished_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
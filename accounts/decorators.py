@@ -0,0 +1,24 @@
+from functools import wraps
+
+from django.contrib import messages
+from django.http import JsonResponse
+from django.shortcuts import redirect
+
+
+def role_required(*roles, json=False):
+    """Only let users whose request.role (accounts.middleware) is in `roles` into the view.
+
+    Anyone else is sent to the dashboard with a message, or gets a 403 JSON
+    error with `json=True`.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.role not in roles:
+                if json:
+                    return JsonResponse({"error": "You do not have a permission."}, status=403)
+                messages.error(request, 'You do not have a permission.')
+                return redirect('dashboard')
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,36 @@
+"""Password hashing in a pool of worker processes, for bulk account imports.
+
+Kept free of model imports: spawned workers import this module before
+Django is set up.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+
+
+def _setup_worker():
+    # Workers are spawned, not forked, so they never share the parent's
+    # database connections; configure Django once per worker.
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+        django.setup()
+
+
+def hash_pool(workers):
+    """A process pool for hash_passwords, or None to hash in this process."""
+    if workers <= 1:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=_setup_worker,
+    )
+
+
+def hash_passwords(passwords, pool=None, workers=1):
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    return list(pool.map(make_password, passwords, chunksize=max(len(passwords) // (workers * 4), 1)))
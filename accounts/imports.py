@@ -0,0 +1,247 @@
+"""Bulk creation of student and teacher accounts from a CSV file.
+
+Each row costs one PBKDF2 password hash, far more than its inserts, so a
+large file takes longer than a request may. The view only saves the
+upload to IMPORT_UPLOAD_DIR and queues an ImportJob; run_import_worker runs
+it with import_csv, hashing in one long-lived process pool of
+IMPORT_HASH_WORKERS, and deletes the file. The plaintext passwords never
+reach the database.
+
+The file is read and validated in chunks of CHUNK_SIZE rows. Each chunk's
+User rows and Student/Teacher rows go in with bulk_create, in one
+transaction. Rows that fail validation are skipped and reported with their
+line number; the rest are imported.
+"""
+import csv
+import io
+import os
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from accounts.hashing import hash_passwords, hash_pool
+from accounts.models import ImportJob
+from attendance_tracker import caching
+from courses.models import Course
+from students.models import Student
+from teachers.models import Teacher
+
+CHUNK_SIZE = 500
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+# A RUNNING job older than this lost its worker; it fails and its upload
+# is deleted.
+JOB_TIMEOUT = timedelta(minutes=30)
+
+COLUMNS = {
+    'students': ('username', 'password', 'first_name', 'last_name', 'phone_number', 'gender', 'course'),
+    'teachers': ('username', 'password', 'first_name', 'last_name', 'phone_number'),
+}
+
+GENDERS = {'m': 'M', 'male': 'M', 'f': 'F', 'female': 'F'}
+
+
+def chunks(reader, size):
+    chunk = []
+    for row in reader:
+        chunk.append((reader.line_num, row))
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Importer:
+    def __init__(self, kind, center):
+        self.kind = kind
+        self.center = center
+        self.usernames = set()
+        self.courses = {}
+        if kind == 'students':
+            for course in Course.objects.filter(center=center):
+                self.courses[str(course.pk)] = course
+                self.courses.setdefault(course.course_name.strip().lower(), course)
+
+    def clean(self, row):
+        """(values, None) for a valid row, or (None, error message)."""
+        values = {column: (row.get(column) or '').strip() for column in COLUMNS[self.kind]}
+        missing = [column for column, value in values.items() if not value and column != 'phone_number']
+        if missing:
+            return None, f"Missing {', '.join(missing)}."
+        if len(values['username']) > 150:
+            return None, "username is longer than 150 characters."
+        if values['username'] in self.usernames:
+            return None, f"username {values['username']} appears more than once in the file."
+        if self.kind == 'students':
+            gender = GENDERS.get(values['gender'].lower())
+            if gender is None:
+                return None, f"Unknown gender {values['gender']!r}; use M or F."
+            course = self.courses.get(values['course']) or self.courses.get(values['course'].lower())
+            if course is None:
+                return None, f"No course {values['course']!r} in this center."
+            values.update(gender=gender, course=course)
+        return values, None
+
+    def profile(self, values, user):
+        fields = dict(
+            first_name=values['first_name'], last_name=values['last_name'],
+            phone_number=values['phone_number'], center=self.center, user=user,
+        )
+        if self.kind == 'students':
+            return Student(course=values['course'], gender=values['gender'], **fields)
+        return Teacher(**fields)
+
+    def run_chunk(self, chunk, errors, pool=None, workers=1):
+        valid = []
+        for line, row in chunk:
+            values, error = self.clean(row)
+            if error:
+                errors.append({"line": line, "username": (row.get('username') or '').strip(), "error": error})
+            else:
+                self.usernames.add(values['username'])
+                valid.append((line, values))
+
+        taken = set(User.objects.filter(username__in=[v['username'] for _, v in valid]).values_list('username', flat=True))
+        for line, values in valid:
+            if values['username'] in taken:
+                errors.append({"line": line, "username": values['username'], "error": "username is already taken."})
+        valid = [(line, values) for line, values in valid if values['username'] not in taken]
+        if not valid:
+            return 0
+
+        hashes = hash_passwords([values['password'] for _, values in valid], pool, workers)
+        try:
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(username=values['username'], password=password)
+                    for (_, values), password in zip(valid, hashes)
+                ])
+                model = Student if self.kind == 'students' else Teacher
+                model.objects.bulk_create([self.profile(values, user) for (_, values), user in zip(valid, users)])
+        except IntegrityError as e:
+            # Another request took one of these usernames since the check above.
+            for line, values in valid:
+                errors.append({"line": line, "username": values['username'], "error": f"Not imported: {e}"})
+            return 0
+        return len(valid)
+
+
+def import_csv(kind, center, file, chunk_size=CHUNK_SIZE, workers=None, pool=None):
+    """Import students or teachers of `center` from the CSV in `file` (bytes or text).
+
+    Hashes in `pool` when given, otherwise in a pool of `workers` made for
+    this call. Returns {"created": n, "errors": [{"line", "username", "error"}, ...]}.
+    """
+    if isinstance(file, io.TextIOBase):
+        text = file
+    else:
+        text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    missing = [column for column in COLUMNS[kind] if column not in (reader.fieldnames or [])]
+    if missing:
+        return {"created": 0, "errors": [{"line": 1, "username": "", "error": f"Missing columns: {', '.join(missing)}."}]}
+
+    workers = settings.IMPORT_HASH_WORKERS if workers is None else workers
+    importer = Importer(kind, center)
+    created, errors = 0, []
+    own_pool = pool is None
+    if own_pool:
+        pool = hash_pool(workers)
+    try:
+        for chunk in chunks(reader, chunk_size):
+            created += importer.run_chunk(chunk, errors, pool, workers)
+    finally:
+        if own_pool and pool is not None:
+            pool.shutdown()
+    if created:
+        caching.bump(center.pk)
+    return {"created": created, "errors": sorted(errors, key=lambda error: error['line'])}
+
+
+def upload_path(job):
+    return os.path.join(settings.IMPORT_UPLOAD_DIR, job.upload)
+
+
+def enqueue(kind, center, text):
+    """Queue the CSV `text` for run_import_worker; returns the ImportJob."""
+    os.makedirs(settings.IMPORT_UPLOAD_DIR, exist_ok=True)
+    # mkstemp creates the file readable by its owner only.
+    fd, path = tempfile.mkstemp(suffix='.csv', dir=settings.IMPORT_UPLOAD_DIR)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as file:
+            file.write(text)
+        return ImportJob.objects.create(center=center, kind=kind, upload=os.path.basename(path))
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+def discard_upload(job):
+    if job.upload:
+        try:
+            os.remove(upload_path(job))
+        except FileNotFoundError:
+            pass
+        job.upload = ''
+
+
+def fail_stale():
+    """Fail RUNNING jobs whose worker stopped, deleting their uploads.
+
+    They are not queued again: the chunks imported before the worker
+    stopped are already in, and the rest can be uploaded again.
+    """
+    stale = ImportJob.objects.filter(status=ImportJob.RUNNING, started_at__lt=timezone.now() - JOB_TIMEOUT)
+    for job in stale:
+        discard_upload(job)
+        job.status = ImportJob.FAILED
+        job.error = "The import worker stopped before finishing; upload the rows that are missing again."
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'upload', 'finished_at'])
+
+
+def claim_next():
+    fail_stale()
+    while True:
+        job = ImportJob.objects.filter(status=ImportJob.PENDING).order_by('created_at').first()
+        if job is None:
+            return None
+        # The conditional update makes the claim safe across several workers.
+        claimed = ImportJob.objects.filter(pk=job.pk, status=ImportJob.PENDING).update(
+            status=ImportJob.RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def run_job(job, pool=None, workers=1):
+    try:
+        with open(upload_path(job), encoding='utf-8', newline='') as file:
+            job.report = import_csv(job.kind, job.center, file, workers=workers, pool=pool)
+    except Exception as e:
+        job.status = ImportJob.FAILED
+        job.error = str(e)
+    else:
+        job.status = ImportJob.DONE
+    finally:
+        # The passwords are hashed or never will be; do not keep them.
+        discard_upload(job)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'report', 'error', 'upload', 'finished_at'])
+    return job
+
+
+def run_pending(pool=None, workers=1, limit=None):
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next()
+        if job is None:
+            break
+        run_job(job, pool, workers)
+        processed += 1
+    return processed
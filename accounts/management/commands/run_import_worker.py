@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts import imports
+from accounts.hashing import hash_pool
+
+
+class Command(BaseCommand):
+    help = "Run queued CSV imports of students and teachers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Password hashing processes (default: IMPORT_HASH_WORKERS).")
+
+    def handle(self, *args, **options):
+        workers = settings.IMPORT_HASH_WORKERS if options['workers'] is None else options['workers']
+        # One pool for the worker's lifetime: its processes start (and set up
+        # Django) once, not per import.
+        pool = hash_pool(workers)
+        try:
+            while True:
+                processed = imports.run_pending(pool, workers)
+                if processed:
+                    self.stdout.write(f"Processed {processed} import job(s).")
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            if pool is not None:
+                pool.shutdown()
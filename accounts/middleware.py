@@ -0,0 +1,87 @@
+"""Resolve whether the user is a center ("admin"), a teacher or a student once per session.
+
+RoleMiddleware sets request.role, request.profile (the user's Teacher or
+Student, None for a center), request.center (the center's User) and
+request.center_id. request.profile and a teacher's or student's
+request.center are loaded on first use; use request.center_id for cache
+keys and filters, which it serves without a query. The role and the ids behind it are kept in the session; a Teacher or Student
+saved or deleted for the user (accounts.signals) makes the next request
+resolve them again. Django does not cache a missing reverse one-to-one,
+so the relations the user does not have are also marked missing on the
+user: `hasattr(request.user, 'teacher_user')` then costs no query.
+"""
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from students.models import Student
+from teachers.models import Teacher
+
+ROLE_SESSION_KEY = '_role'
+PROFILES = {'teacher': 'teacher_user', 'student': 'student_user'}
+
+
+def _version_key(user_id):
+    return f"role-version:{user_id}"
+
+
+def reset_role(user_id):
+    cache.set(_version_key(user_id), time.time_ns(), timeout=None)
+
+
+def resolve_role(user):
+    """(role, profile id, center id) of an authenticated user."""
+    for role, model in (('teacher', Teacher), ('student', Student)):
+        profile = model.objects.filter(user=user).values_list('pk', 'center_id').first()
+        if profile is not None:
+            return role, *profile
+    return 'admin', None, user.pk
+
+
+def attach_role(request, user):
+    request.role = request.profile = request.center = request.center_id = None
+    if not user.is_authenticated:
+        return
+    version = cache.get(_version_key(user.pk))
+    cached = request.session.get(ROLE_SESSION_KEY)
+    if not cached or cached[:2] != [user.pk, version]:
+        cached = [user.pk, version, *resolve_role(user)]
+        request.session[ROLE_SESSION_KEY] = cached
+    role, center_id = cached[2], cached[4]
+
+    User = get_user_model()
+    for other, accessor in PROFILES.items():
+        if other != role:
+            getattr(User, accessor).related.set_cached_value(user, None)
+    request.role = role
+    request.center_id = center_id
+    if role == 'admin':
+        request.center = user
+    else:
+        request.profile = SimpleLazyObject(lambda: getattr(user, PROFILES[role]))
+        request.center = SimpleLazyObject(lambda: User.objects.get(pk=center_id))
+
+
+class RoleMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        attach_role(request, request.user)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # request.auser() loads the user separately from request.user; share one.
+        request.user = await request.auser()
+        await sync_to_async(attach_role)(request, request.user)
+        return await self.get_response(request)
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:18
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fail_unfinished_jobs(apps, schema_editor):
+    # Their CSV lives in the column being dropped; it is not carried over so
+    # the passwords in it are gone with it.
+    ImportJob = apps.get_model('accounts', 'ImportJob')
+    ImportJob.objects.filter(status__in=['pending', 'running']).update(
+        status='failed', error="Upload the file again.", finished_at=timezone.now(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_unfinished_jobs, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='importjob',
+            name='data',
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='upload',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
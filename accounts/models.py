@@ -1,4 +1,40 @@
-from django.contrib.auth.models import AbstractUser
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
\ No newline at end of file
+
+class ImportJob(models.Model):
+    # A CSV import of students or teachers, run by run_import_worker so the
+    # password hashing stays out of the request.
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+    KIND_CHOICES = (
+        ('students', 'Students'),
+        ('teachers', 'Teachers'),
+    )
+    center = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='import_jobs')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # File name of the uploaded CSV in IMPORT_UPLOAD_DIR. The passwords stay
+    # in that file, never in the database; the worker deletes it.
+    upload = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    report = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='import_job_queue'),
+        ]
+
+    def __str__(self):
+        return f"{self.center} - {self.kind} - {self.status} - {self.created_at}"
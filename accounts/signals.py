@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.middleware import reset_role
+from students.models import Student
+from teachers.models import Teacher
+
+
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=Teacher)
+def reset_user_role(sender, instance, **kwargs):
+    reset_role(instance.user_id)
@@ -0,0 +1,125 @@
+import os
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts import imports
+from accounts.models import ImportJob
+from attendance_tracker.tests import CenterTestCase
+from students.models import Student
+from teachers.models import Teacher
+
+CSV = (
+    "username,password,first_name,last_name,phone_number,gender,course\n"
+    "new-1,secret-1,Ann,Lee,1,F,Math\n"
+    "new-2,secret-2,Bob,Kim,2,X,Math\n"
+)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportJobTests(CenterTestCase):
+    def setUp(self):
+        self.upload_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.upload_dir.cleanup)
+        self.enterContext(override_settings(IMPORT_UPLOAD_DIR=self.upload_dir.name))
+
+    def uploads(self):
+        return os.listdir(self.upload_dir.name)
+
+    def test_upload_is_imported_by_the_worker(self):
+        self.client.force_login(self.center)
+        url = reverse('import-students')
+        response = self.client.post(url, {'file': SimpleUploadedFile('students.csv', CSV.encode())})
+        job = ImportJob.objects.get()
+        self.assertRedirects(response, f"{url}?job={job.pk}")
+        self.assertEqual(job.status, ImportJob.PENDING)
+        self.assertEqual(self.uploads(), [job.upload])
+        self.assertNotIn('secret-1', str(ImportJob.objects.values().get()))
+        self.assertFalse(Student.objects.filter(first_name='Ann').exists())
+
+        self.assertEqual(imports.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.DONE)
+        self.assertEqual((job.upload, self.uploads()), ('', []))
+        self.assertEqual(job.report['created'], 1)
+        self.assertEqual([error['line'] for error in job.report['errors']], [3])
+        self.assertTrue(self.client.login(username='new-1', password='secret-1'))
+
+        self.client.force_login(self.center)
+        response = self.client.get(f"{url}?job={job.pk}")
+        self.assertContains(response, 'Imported 1 students, 1 row skipped')
+
+    def test_other_centers_jobs_are_hidden(self):
+        job = imports.enqueue('students', self.teacher.user, CSV)
+        self.client.force_login(self.center)
+        response = self.client.get(f"{reverse('import-students')}?job={job.pk}")
+        self.assertIsNone(response.context['job'])
+
+    def test_stale_running_job_fails_and_loses_its_upload(self):
+        job = imports.enqueue('students', self.center, CSV)
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.RUNNING, started_at=timezone.now() - imports.JOB_TIMEOUT - timedelta(minutes=1),
+        )
+        self.assertEqual(imports.run_pending(), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.upload, self.uploads()), (ImportJob.FAILED, '', []))
+        self.assertFalse(Student.objects.filter(first_name='Ann').exists())
+
+    def test_admin_is_read_only(self):
+        job = imports.enqueue('students', self.center, CSV)
+        self.client.force_login(User.objects.create_superuser('root', password='pw'))
+        response = self.client.get(reverse('admin:accounts_importjob_change', args=[job.pk]))
+        self.assertNotContains(response, job.upload)
+        self.assertNotContains(response, 'name="_save"')
+        self.assertEqual(self.client.get(reverse('admin:accounts_importjob_add')).status_code, 403)
+
+
+class RoleMiddlewareTests(CenterTestCase):
+    def warm(self, user):
+        # The first request resolves the role and keeps it in the session.
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(reverse('course-list'))
+        return len(cold)
+
+    def test_admin_view(self):
+        cold = self.warm(self.center)
+        # Session, user, courses, teachers; no Teacher or Student lookup for the role.
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('course-list'))
+        self.assertEqual(response.context['role'], 'admin')
+        self.assertGreater(cold, 4)
+
+    def test_teacher_view(self):
+        cold = self.warm(self.teacher.user)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('course-list'))
+        self.assertEqual(response.context['role'], 'teacher')
+        self.assertGreater(cold, 4)
+
+    def test_center_id_needs_no_query(self):
+        self.warm(self.teacher.user)
+        self.client.get(reverse('select-course'))
+        # Session and user; today's courses are cached under request.center_id.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('select-course'))
+        self.assertEqual([item['course'] for item in response.context['courses']], [self.course])
+
+    def test_role_follows_profile_changes(self):
+        self.warm(self.teacher.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.delete()
+            Teacher.objects.filter(pk=self.teacher.pk).delete()
+        self.assertEqual(self.client.get(reverse('course-list')).context['role'], 'admin')
+
+    def test_students_are_turned_away(self):
+        self.client.force_login(self.students[0].user)
+        self.assertRedirects(self.client.get(reverse('course-list')), reverse('dashboard'), fetch_redirect_response=False)
+        self.assertRedirects(self.client.get(reverse('import-students')), reverse('dashboard'), fetch_redirect_response=False)
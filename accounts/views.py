@@ -1,8 +1,13 @@
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 
+from accounts.decorators import role_required
+from accounts.imports import COLUMNS, MAX_UPLOAD_BYTES, enqueue
+from accounts.models import ImportJob
+
 
 def register(request):
     if request.user.is_authenticated:
@@ -45,4 +50,34 @@ def login_view(request):
 
 def logout_view(request):
     logout(request)
-    return redirect('index')
\ No newline at end of file
+    return redirect('index')
+
+@login_required
+@role_required('admin')
+def import_users(request, kind):
+    # Centers only: teachers and students cannot create accounts.
+    data = {
+        "kind": kind,
+        "columns": COLUMNS[kind],
+        "list_url": 'student-list' if kind == 'students' else 'teachers-list',
+    }
+    if request.method == "POST":
+        upload = request.FILES.get('file')
+        if upload is None:
+            messages.error(request, 'Choose a CSV file to import.')
+        elif upload.size > MAX_UPLOAD_BYTES:
+            messages.error(request, f'The file is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.')
+        else:
+            try:
+                text = upload.read().decode('utf-8-sig')
+            except UnicodeDecodeError:
+                messages.error(request, 'The file is not UTF-8 text.')
+            else:
+                job = enqueue(kind, request.user, text)
+                return redirect(f"{request.path}?job={job.pk}")
+    job_id = request.GET.get('job')
+    if job_id and job_id.isdigit():
+        data["job"] = ImportJob.objects.filter(pk=job_id, center=request.user, kind=kind).first()
+        if data["job"] is not None:
+            data["report"] = data["job"].report
+    return render(request, 'accounts/import_users.html', data)
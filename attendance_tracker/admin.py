@@ -1,6 +1,52 @@
 from django.contrib import admin
+from django.db import transaction
 
+from attendance_tracker import rollup, student_stats
 from .models import *
 # Register your models here.
 
-admin.site.register(Attendance)
\ No newline at end of file
+@admin.register(Attendance)
+class AttendanceAdmin(admin.ModelAdmin):
+    # Edits here bypass marking(), so they keep the rollup and StudentStats
+    # in step themselves.
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            students = {obj.student_id}
+            if change:
+                old = Attendance.objects.select_for_update().filter(pk=obj.pk)
+                students.update(old.values_list('student_id', flat=True))
+                rollup.forget(old)
+            super().save_model(request, obj, form, change)
+            rollup.record_marks(obj.center, obj.course, obj.lesson_date,
+                                present=int(obj.status), absent=int(not obj.status))
+            student_stats.refresh(students)
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, Attendance.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            students = set(queryset.values_list('student_id', flat=True))
+            rollup.forget(queryset)
+            queryset.delete()
+            student_stats.refresh(students)
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    # Archived rows only change through archive_attendance, which keeps
+    # ArchivedAttendanceSummary and StudentStats in step; edits here would not.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+admin.site.register(DailyAttendance)
+admin.site.register(ArchivedAttendance, ReadOnlyAdmin)
+admin.site.register(ArchivedAttendanceSummary, ReadOnlyAdmin)
+admin.site.register(StudentStats)
+admin.site.register(Insight)
+admin.site.register(InsightJob)
+admin.site.register(IdempotencyKey)
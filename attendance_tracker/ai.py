@@ -0,0 +1,120 @@
+import logging
+from concurrent import futures
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    'vertex': 'attendance_tracker.ai.VertexBackend',
+    'local': 'attendance_tracker.ai.LocalBackend',
+    'disabled': 'attendance_tracker.ai.DisabledBackend',
+}
+
+_backend = None
+_executor = None
+
+logger = logging.getLogger(__name__)
+
+
+class BaseBackend:
+    # `facts` carries the numbers the prompt was built from, so backends that
+    # do not call a language model can still produce a report.
+    def generate(self, prompt, facts):
+        raise NotImplementedError
+
+
+class VertexBackend(BaseBackend):
+    def __init__(self):
+        self._model = None
+
+    @property
+    def model(self):
+        # vertexai is slow to import and needs credentials; only pay for it on first use.
+        if self._model is None:
+            import vertexai
+            from vertexai import generative_models
+
+            vertexai.init(project=settings.VERTEX_PROJECT, location=settings.VERTEX_LOCATION)
+            self._model = generative_models.GenerativeModel(settings.VERTEX_MODEL)
+        return self._model
+
+    def generate(self, prompt, facts):
+        return self.model.generate_content(prompt).text
+
+
+class LocalBackend(BaseBackend):
+    def generate(self, prompt, facts):
+        bullet = '<span style="color: var(--main-color);"><b>-</b></span>'
+        low = facts['low_students']
+        if low:
+            # The report is HTML; names are user input.
+            names = ", ".join(escape(name) for name in low[:3]) + (f" and {len(low) - 3} more" if len(low) > 3 else "")
+            low_line = f"{len(low)} student(s) below 70% in their last 4 records: {names}."
+        else:
+            low_line = "No students are below 70% in their last 4 records."
+
+        change = facts['predicted_rate'] - facts['last_week_rate']
+        if abs(change) < 1:
+            trend_line = "Attendance is expected to stay about the same next week."
+        else:
+            direction = "rise" if change > 0 else "drop"
+            trend_line = f"Attendance is expected to {direction} by {abs(change):.2f} points next week."
+
+        overall_line = f"Overall attendance rate is {facts['overall_rate']:.2f}% across {facts['records']} records."
+
+        return (
+            f"<b>Attendance report:</b><br>"
+            f"{bullet} Attendance rate for last week: <span style=\"color: var(--main-color);\"><b>{facts['last_week_rate']}%</b></span><br>"
+            f"{bullet} Predicted attendance rate for next week: <span style=\"color: var(--main-color);\"><b>{facts['predicted_rate']}%</b></span><br>"
+            f"<b>Essential highlights:</b><br>"
+            f"{bullet} {low_line}<br>"
+            f"{bullet} {trend_line}<br>"
+            f"{bullet} {overall_line}<br>"
+        )
+
+
+class DisabledBackend(BaseBackend):
+    def generate(self, prompt, facts):
+        return "zedAI insights are disabled."
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        path = BACKENDS.get(settings.AI_BACKEND, settings.AI_BACKEND)
+        _backend = import_string(path)()
+    return _backend
+
+
+def generate(prompt, facts, timeout=None):
+    """The configured backend's report, or LocalBackend's if it fails or takes over AI_TIMEOUT_SECONDS.
+
+    The backend runs in a worker thread, so a hung remote call costs the
+    caller at most the timeout; the call itself is left to finish or fail
+    in the background.
+    """
+    global _executor
+    backend = get_backend()
+    if isinstance(backend, (LocalBackend, DisabledBackend)):
+        return backend.generate(prompt, facts)
+    if _executor is None:
+        _executor = futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix='zedai')
+    future = _executor.submit(backend.generate, prompt, facts)
+    timeout = settings.AI_TIMEOUT_SECONDS if timeout is None else timeout
+    try:
+        return future.result(timeout=timeout)
+    except futures.TimeoutError:
+        logger.warning("zedAI backend took longer than %s s; using the local report.", timeout)
+    except Exception:
+        logger.exception("zedAI backend failed; using the local report.")
+    return LocalBackend().generate(prompt, facts)
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    global _backend
+    if setting == 'AI_BACKEND':
+        _backend = None
@@ -0,0 +1,220 @@
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from attendance_tracker import rollup
+from attendance_tracker.models import ArchivedAttendance, Attendance, DailyAttendance, StudentStats
+from courses.models import Course
+from students.models import Student
+from teachers.models import Teacher
+
+
+def count_subquery(qs, outer):
+    # COUNT(*) of `qs` correlated on `outer`, without joining it into the outer query.
+    counts = qs.filter(**{outer: OuterRef('pk')}).order_by().values(outer).annotate(c=Count('*')).values('c')
+    return Coalesce(Subquery(counts), 0)
+
+
+def with_stats(students):
+    """Students with their attendance_rate from StudentStats: a join instead of a GROUP BY.
+
+    The rate is None for students without any records.
+    """
+    return students.annotate(attendance_rate=F('stats__rate'))
+
+
+class Scope:
+    # Lookup from each model to the owner of the scope, per scope kind.
+    LOOKUPS = {
+        'center': {
+            Student: 'center',
+            Course: 'center',
+            Teacher: 'center',
+            Attendance: 'center',
+            ArchivedAttendance: 'center',
+            DailyAttendance: 'center',
+            StudentStats: 'center',
+        },
+        'teacher': {
+            Student: 'course__course_teacher__user',
+            Course: 'course_teacher__user',
+            Teacher: 'user',
+            Attendance: 'course__course_teacher__user',
+            ArchivedAttendance: 'course__course_teacher__user',
+            DailyAttendance: 'course__course_teacher__user',
+            StudentStats: 'student__course__course_teacher__user',
+        },
+        'student': {
+            Student: 'pk',
+            Course: 'student',
+            Teacher: 'course__student',
+            Attendance: 'student',
+            ArchivedAttendance: 'student',
+            StudentStats: 'student',
+        },
+    }
+
+    def __init__(self, center=None, teacher=None, student=None):
+        if center is not None:
+            self.kind, self.owner = 'center', center
+        elif teacher is not None:
+            self.kind, self.owner = 'teacher', teacher
+        elif student is not None:
+            self.kind, self.owner = 'student', student
+        else:
+            raise ValueError("A scope needs a center, a teacher or a student.")
+
+    def filter(self, model):
+        lookup = self.LOOKUPS[self.kind].get(model)
+        if lookup is None:
+            return None
+        return model.objects.filter(**{lookup: self.owner})
+
+    def students(self):
+        return self.filter(Student)
+
+    def courses(self):
+        return self.filter(Course)
+
+    def teachers(self):
+        return self.filter(Teacher)
+
+    def attendance(self):
+        return self.filter(Attendance)
+
+    def archive(self):
+        return self.filter(ArchivedAttendance)
+
+    def daily(self):
+        return self.filter(DailyAttendance)
+
+    def stats(self):
+        return self.filter(StudentStats)
+
+
+def _overview(scope, today):
+    today = today or timezone.localdate()
+    return scope.courses(), dict(
+        courses_count=Count('id', distinct=True),
+        todays_courses=Count('id', distinct=True, filter=Q(schedule__weekday=today.weekday())),
+        students_count=Count('student', distinct=True),
+    )
+
+
+def _today(scope, today):
+    today = today or timezone.localdate()
+    return scope.attendance().filter(lesson_date=today), dict(
+        present_today=Count('student', distinct=True, filter=Q(status=True)),
+        absent_today=Count('student', distinct=True, filter=Q(status=False)),
+        present=Count('id', filter=Q(status=True)),
+        total=Count('id'),
+    )
+
+
+def _today_result(totals):
+    return {
+        "present_today": totals['present_today'],
+        "absent_today": totals['absent_today'],
+        "attendance_rate_today": _percent(totals),
+    }
+
+
+def _rate(scope):
+    daily = scope.daily()
+    if daily is not None:
+        return daily, dict(present=Sum('present'), total=Sum('total'))
+    return scope.attendance(), dict(present=Count('id', filter=Q(status=True)), total=Count('id'))
+
+
+def _percent(totals):
+    return totals['present'] / totals['total'] * 100 if totals['total'] else 0
+
+
+# Each aggregate below has an async twin for the ASGI dashboards, built from
+# the same queryset and aggregates.
+
+def overview(scope, today=None):
+    """Course, today's course and student counts in one query."""
+    qs, aggregates = _overview(scope, today)
+    return qs.aggregate(**aggregates)
+
+
+async def aoverview(scope, today=None):
+    qs, aggregates = _overview(scope, today)
+    return await qs.aaggregate(**aggregates)
+
+
+def today_summary(scope, today=None):
+    """Present/absent students and the attendance rate for today in one query."""
+    qs, aggregates = _today(scope, today)
+    return _today_result(qs.aggregate(**aggregates))
+
+
+async def atoday_summary(scope, today=None):
+    qs, aggregates = _today(scope, today)
+    return _today_result(await qs.aaggregate(**aggregates))
+
+
+def attendance_rate(scope):
+    qs, aggregates = _rate(scope)
+    return _percent(qs.aggregate(**aggregates))
+
+
+async def aattendance_rate(scope):
+    qs, aggregates = _rate(scope)
+    return _percent(await qs.aaggregate(**aggregates))
+
+
+def trend(scope, start=None, end=None):
+    daily = scope.daily()
+    if daily is not None:
+        return rollup.trend(daily, start, end)
+    rows = scope.attendance()
+    if start and end:
+        rows = rows.filter(lesson_date__range=(start, end))
+    rows = rows.values('lesson_date').annotate(count=Count('id')).order_by('lesson_date')
+    return {
+        "labels": [row["lesson_date"].strftime("%Y-%m-%d") for row in rows],
+        "values": [row["count"] for row in rows],
+    }
+
+
+def gender_breakdown(scope):
+    gender_counts = scope.students().values('gender').annotate(count=Count('id')).order_by('gender')
+    return {
+        "labels": [("Male" if g["gender"] == "M" else "Female") for g in gender_counts],
+        "values": [g["count"] for g in gender_counts],
+    }
+
+
+def _students(stats):
+    # The students of StudentStats rows, with the numbers the widgets show.
+    students = []
+    for row in stats:
+        student = row.student
+        student.attendance_rate = row.rate
+        student.total_lessons, student.present, student.absent = row.total, row.present, row.absent
+        students.append(student)
+    return students
+
+
+def ranked_students(scope, limit=10):
+    # Students without records have no stats row, so they are in neither list.
+    stats = scope.stats().select_related('student__course')
+    return {
+        "top_students": _students(stats.order_by('-rate')[:limit]),
+        "students_low_attendance": _students(stats.order_by('rate')[:limit]),
+    }
+
+
+def most_regular_students(scope, limit=5):
+    stats = scope.stats().select_related('student__course')
+    return _students(stats.order_by('absent', '-present')[:limit])
+
+
+def recent_records(scope, limit=10):
+    return list(
+        scope.attendance()
+        .select_related('student__course__course_teacher', 'course')
+        .order_by('-time')[:limit]
+    )
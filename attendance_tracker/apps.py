@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AttendanceTrackerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'attendance_tracker'
+
+    def ready(self):
+        from attendance_tracker import signals  # noqa: F401
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from attendance_tracker import caching
+from attendance_tracker.models import ArchivedAttendance, ArchivedAttendanceSummary, Attendance
+
+FIELDS = ('id', 'student_id', 'time', 'lesson_date', 'course_id', 'status', 'center_id', 'user_id', 'marked_by_id')
+
+
+def horizon(days=None):
+    """The first lesson date kept in the live Attendance table."""
+    days = settings.ATTENDANCE_HOT_DAYS if days is None else days
+    return timezone.localdate() - timedelta(days=days)
+
+
+def refresh_summaries(student_ids, batch_size=1000):
+    rows = (
+        ArchivedAttendance.objects.filter(student_id__in=student_ids)
+        .values('student_id')
+        .annotate(total=Count('id'), present=Count('id', filter=Q(status=True)), last=Max('lesson_date'))
+        .order_by()
+    )
+    ArchivedAttendanceSummary.objects.bulk_create(
+        [
+            ArchivedAttendanceSummary(
+                student_id=row['student_id'],
+                total=row['total'],
+                present=row['present'],
+                absent=row['total'] - row['present'],
+                last_lesson_date=row['last'],
+            )
+            for row in rows
+        ],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['student'],
+        update_fields=['total', 'present', 'absent', 'last_lesson_date'],
+    )
+
+
+def archive_before(cutoff, center=None, batch_size=1000):
+    """Move Attendance rows with a lesson date before `cutoff` into the archive.
+
+    Works in batches, each in its own transaction: copy the rows with their
+    ids, recompute the archive summaries of the students involved, then
+    delete the originals. The daily rollup is left alone, so dashboards and
+    forecasts still see the archived days. Returns the number of rows moved.
+    """
+    old = Attendance.objects.filter(lesson_date__lt=cutoff)
+    if center is not None:
+        old = old.filter(center=center)
+
+    moved = 0
+    centers = set()
+    while True:
+        with transaction.atomic():
+            rows = list(old.order_by('id').values(*FIELDS)[:batch_size])
+            if not rows:
+                break
+            ArchivedAttendance.objects.bulk_create(
+                [ArchivedAttendance(**row) for row in rows], ignore_conflicts=True,
+            )
+            refresh_summaries({row['student_id'] for row in rows}, batch_size=batch_size)
+            Attendance.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        moved += len(rows)
+        centers.update(row['center_id'] for row in rows)
+
+    for center_id in centers - {None}:
+        caching.bump(center_id)
+    return moved
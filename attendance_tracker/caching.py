@@ -0,0 +1,93 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.db import transaction
+
+COUNTERS_CACHE = "counters"
+HITS_KEY = "center-cache:hits"
+MISSES_KEY = "center-cache:misses"
+
+_missing = object()
+
+
+def _version_key(center_id):
+    return f"center-version:{center_id}"
+
+
+def version(center_id):
+    # A timestamp rather than a counter: if the version key is evicted the
+    # next one is still new, so stale entries can never be served again.
+    return cache.get_or_set(_version_key(center_id), time.time_ns, timeout=None)
+
+
+async def aversion(center_id):
+    return await cache.aget_or_set(_version_key(center_id), time.time_ns, timeout=None)
+
+
+def bump(center_id):
+    """Invalidate everything cached for `center_id` once the current transaction commits.
+
+    Bumping before the commit would let a concurrent request cache the old
+    rows under the new version.
+    """
+    if center_id is None:
+        return
+    transaction.on_commit(lambda: cache.set(_version_key(center_id), time.time_ns(), timeout=None))
+
+
+def _counters():
+    # A separate cache when configured, so culling entries never resets them.
+    return caches[COUNTERS_CACHE if COUNTERS_CACHE in settings.CACHES else DEFAULT_CACHE_ALIAS]
+
+
+def _count(key):
+    # Not atomic on every backend; good enough for a hit ratio.
+    counters = _counters()
+    if not counters.add(key, 1, timeout=None):
+        try:
+            counters.incr(key)
+        except ValueError:
+            counters.set(key, 1, timeout=None)
+
+
+def get_or_compute(center_id, name, compute, timeout=None):
+    """Return the cached value of `name` for the center's current data, computing it on a miss."""
+    key = f"center:{center_id}:{version(center_id)}:{name}"
+    value = cache.get(key, _missing)
+    if value is _missing:
+        _count(MISSES_KEY)
+        value = compute()
+        cache.set(key, value, timeout=timeout or settings.CENTER_CACHE_SECONDS)
+    else:
+        _count(HITS_KEY)
+    return value
+
+
+async def aget_or_compute(center_id, name, compute, timeout=None):
+    """get_or_compute for async views; `compute` returns an awaitable."""
+    key = f"center:{center_id}:{await aversion(center_id)}:{name}"
+    value = await cache.aget(key, _missing)
+    if value is _missing:
+        await sync_to_async(_count)(MISSES_KEY)
+        value = await compute()
+        await cache.aset(key, value, timeout=timeout or settings.CENTER_CACHE_SECONDS)
+    else:
+        await sync_to_async(_count)(HITS_KEY)
+    return value
+
+
+def stats():
+    counters = _counters()
+    hits, misses = counters.get(HITS_KEY, 0), counters.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total * 100 if total else 0,
+    }
+
+
+def reset_stats():
+    _counters().delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,62 @@
+import csv
+from itertools import chain
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    # csv.writer only needs write(); hand each formatted line straight back.
+    def write(self, value):
+        return value
+
+
+def export_to_csv(filename, headers, rows):
+    """Stream `rows` (any iterable of sequences) as a CSV download."""
+    writer = csv.writer(Echo())
+
+    def lines():
+        yield writer.writerow(headers)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def export_students(students):
+    headers = ["First Name", "Last Name", "Course", "Phone Number", "Registration Date", "Gender"]
+    rows = students.values_list(
+        'first_name', 'last_name', 'course__course_name', 'phone_number', 'registration_date', 'gender'
+    ).order_by('id').iterator(chunk_size=CHUNK_SIZE)
+    return export_to_csv('students', headers, rows)
+
+
+def export_teachers(teachers):
+    headers = ["First Name", "Last Name", "Phone Number"]
+    rows = teachers.values_list(
+        'first_name', 'last_name', 'phone_number'
+    ).order_by('id').iterator(chunk_size=CHUNK_SIZE)
+    return export_to_csv('teachers-list', headers, rows)
+
+
+def export_attendance(sources):
+    """Stream the rows of each queryset in `sources` (live, then archived), newest first within each."""
+    headers = ["Student", "Date", "Time", "Course", "Status", "Marked By"]
+    rows = chain.from_iterable(
+        source.values_list(
+            'student__first_name', 'student__last_name', 'lesson_date', 'time',
+            'course__course_name', 'status', 'marked_by__username',
+        ).order_by('-time', '-id').iterator(chunk_size=CHUNK_SIZE)
+        for source in sources
+    )
+    return export_to_csv('attendance-history', headers, (
+        [
+            f"{first_name} {last_name}", lesson_date, timezone.localtime(time).strftime("%Y-%m-%d %H:%M"),
+            course, "Present" if status else "Absent", marked_by or "",
+        ]
+        for first_name, last_name, lesson_date, time, course, status, marked_by in rows
+    ))
@@ -0,0 +1,118 @@
+from datetime import datetime
+
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import formats, timezone
+
+from attendance_tracker import analytics
+from attendance_tracker.pagination import encode_cursor, keyset_page
+
+PAGE_SIZE = 25
+
+KEYSET = ('time', 'id')
+
+COLUMNS = (
+    'id', 'time', 'status',
+    'student_id', 'student__first_name', 'student__last_name',
+    'course_id', 'course__course_name',
+    'marked_by__username',
+)
+
+
+def history_scope(role, user):
+    """The Scope of `user`, whose request.role is `role` (a center or a teacher)."""
+    if role == 'teacher':
+        return analytics.Scope(teacher=user)
+    return analytics.Scope(center=user)
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def filter_history(scope, params):
+    """Apply the history filters in `params` (a, b, student, course, teacher, archived).
+
+    Returns the filtered querysets to read from (the live table, then the
+    archive when `archived=1` asks for it) and the selected values for the
+    filter form.
+    """
+    sources = [scope.attendance()]
+    selected = {}
+    conditions = Q()
+
+    if params.get('archived') == '1':
+        sources.append(scope.archive())
+        selected['archived'] = True
+
+    a, b = parse_date(params.get('a')), parse_date(params.get('b'))
+    if a and b:
+        conditions &= Q(lesson_date__range=(a, b))
+        selected['a'], selected['b'] = a.isoformat(), b.isoformat()
+
+    student = params.get('student')
+    if student and student.isdigit():
+        conditions &= Q(student_id=student)
+        selected['student'] = scope.students().filter(pk=student).first()
+
+    course = params.get('course')
+    if course and course.isdigit():
+        conditions &= Q(course_id=course)
+        selected['course'] = scope.courses().filter(pk=course).first()
+
+    teacher = params.get('teacher')
+    if teacher and teacher.isdigit():
+        conditions &= Q(course__course_teacher_id=teacher)
+        selected['teacher'] = scope.teachers().filter(pk=teacher).first()
+
+    return [source.filter(conditions) for source in sources], selected
+
+
+def history_count(sources):
+    return sum(source.count() for source in sources)
+
+
+def _newest_first(rows):
+    return sorted(rows, key=lambda row: tuple(row[field] for field in KEYSET), reverse=True)
+
+
+def history_page(sources, cursor=None, start=0, size=PAGE_SIZE):
+    """One page of history rows from `sources`, newest first.
+
+    With a cursor the page is fetched by keyset on (time, id), so deep pages
+    cost the same as the first one; without one it falls back to `start`.
+    Archived rows keep their ids, so (time, id) orders both tables as one.
+    """
+    if cursor or not start:
+        rows, more = [], False
+        for source in sources:
+            page, next_cursor = keyset_page(source.values(*COLUMNS), KEYSET, cursor=cursor, size=size)
+            rows += page
+            more = more or next_cursor is not None
+        page = _newest_first(rows)
+    else:
+        rows = []
+        for source in sources:
+            rows += source.values(*COLUMNS).order_by('-time', '-id')[:start + size + 1]
+        page = _newest_first(rows)[start:]
+        more = len(page) > size
+
+    more = more or len(page) > size
+    page = page[:size]
+    next_cursor = encode_cursor([page[-1][field] for field in KEYSET]) if more and page else None
+    return page, next_cursor
+
+
+def serialize_row(row):
+    return {
+        "student": f"{row['student__first_name']} {row['student__last_name']}",
+        "student_url": reverse('student-details', args=[row['student_id']]),
+        "time": formats.date_format(timezone.localtime(row['time']), 'DATETIME_FORMAT'),
+        "course": row['course__course_name'],
+        "course_url": reverse('course-details', args=[row['course_id']]),
+        "status": row['status'],
+        "marked_by": row['marked_by__username'] or "",
+    }
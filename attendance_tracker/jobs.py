@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from attendance_tracker.models import Insight, InsightJob
+
+
+def is_stale(insight):
+    if insight is None or insight.generated_at is None:
+        return True
+    max_age = timedelta(minutes=settings.INSIGHT_MAX_AGE_MINUTES)
+    return timezone.now() - insight.generated_at > max_age
+
+
+def requeue_stuck():
+    # A job left RUNNING past the timeout lost its worker; let another take it.
+    cutoff = timezone.now() - timedelta(minutes=settings.INSIGHT_JOB_TIMEOUT_MINUTES)
+    return InsightJob.objects.filter(status=InsightJob.RUNNING, started_at__lt=cutoff).update(
+        status=InsightJob.PENDING, started_at=None
+    )
+
+
+def enqueue_insight(center):
+    # One outstanding job per center is enough; later requests reuse it.
+    requeue_stuck()
+    job = InsightJob.objects.filter(
+        center=center, status__in=[InsightJob.PENDING, InsightJob.RUNNING]
+    ).first()
+    if job is not None:
+        return job
+    # After a failure, wait before asking the backend again; the dashboard
+    # polls insight_status every few seconds.
+    retry_after = timezone.now() - timedelta(minutes=settings.INSIGHT_RETRY_MINUTES)
+    failed = InsightJob.objects.filter(
+        center=center, status=InsightJob.FAILED, finished_at__gte=retry_after
+    ).order_by('-finished_at').first()
+    if failed is not None:
+        return failed
+    return InsightJob.objects.create(center=center)
+
+
+def claim_next():
+    requeue_stuck()
+    while True:
+        job = InsightJob.objects.filter(status=InsightJob.PENDING).order_by('created_at').first()
+        if job is None:
+            return None
+        # The conditional update makes the claim safe across several workers.
+        claimed = InsightJob.objects.filter(pk=job.pk, status=InsightJob.PENDING).update(
+            status=InsightJob.RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def run_job(job, generate):
+    try:
+        text = generate(job.center)
+    except Exception as e:
+        job.status = InsightJob.FAILED
+        job.error = str(e)
+    else:
+        Insight.objects.update_or_create(
+            center=job.center, defaults={'text': text, 'generated_at': timezone.now()}
+        )
+        job.status = InsightJob.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
+
+
+def run_pending(generate, limit=None):
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next()
+        if job is None:
+            break
+        run_job(job, generate)
+        processed += 1
+    return processed
@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance_tracker import archive
+
+
+class Command(BaseCommand):
+    help = "Move attendance older than the hot window into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Days of attendance to keep live (default: ATTENDANCE_HOT_DAYS).")
+        parser.add_argument('--center', type=int, help="Only archive rows of this center (user id).")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        center = None
+        if options['center'] is not None:
+            try:
+                center = get_user_model().objects.get(pk=options['center'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Center {options['center']} does not exist.")
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError("--days must not be negative.")
+
+        cutoff = archive.horizon(options['days'])
+        count = archive.archive_before(cutoff, center=center, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {count} attendance rows from before {cutoff}."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from attendance_tracker import caching
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the per-center cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after printing them.")
+
+    def handle(self, *args, **options):
+        stats = caching.stats()
+        self.stdout.write(
+            f"hits: {stats['hits']}  misses: {stats['misses']}  hit rate: {stats['hit_rate']:.1f}%"
+        )
+        if options['reset']:
+            caching.reset_stats()
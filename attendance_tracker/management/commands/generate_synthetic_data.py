@@ -0,0 +1,40 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance_tracker import synthetic
+
+
+class Command(BaseCommand):
+    help = "Generate centers with teachers, courses, students and schedule-consistent attendance."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--centers', type=int, default=1)
+        parser.add_argument('--teachers', type=int, default=5, help="Teachers per center.")
+        parser.add_argument('--students', type=int, default=100, help="Students per center.")
+        parser.add_argument('--days', type=int, default=30, help="Days of attendance history, ending yesterday.")
+        parser.add_argument('--courses-per-teacher', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='synth', help="Username prefix for every generated account.")
+        parser.add_argument('--password', default='synthetic', help="Password for every generated account.")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=f"{options['prefix']}-").exists():
+            raise CommandError(f"Users with the prefix '{options['prefix']}-' already exist; pick another --prefix.")
+
+        counts = synthetic.generate(
+            centers=options['centers'],
+            teachers=options['teachers'],
+            students=options['students'],
+            days=options['days'],
+            courses_per_teacher=options['courses_per_teacher'],
+            seed=options['seed'],
+            prefix=options['prefix'],
+            password=options['password'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            "Created {centers} center(s), {teachers} teachers, {courses} courses, "
+            "{students} students and {attendance} attendance rows.".format(**counts)
+        ))
+        self.stdout.write(f"Log in as {options['prefix']}-center-0 with password '{options['password']}'.")
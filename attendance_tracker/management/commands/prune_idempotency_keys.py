@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from attendance_tracker import sync
+
+
+class Command(BaseCommand):
+    help = "Delete sync API idempotency keys older than IDEMPOTENCY_KEY_DAYS."
+
+    def handle(self, *args, **options):
+        count = sync.prune_keys()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {count} idempotency keys."))
@@ -0,0 +1,23 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance_tracker import student_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-student attendance stats from the Attendance table and the archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--center', type=int, help="Only rebuild stats of this center's students (user id).")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        center = None
+        if options['center'] is not None:
+            try:
+                center = get_user_model().objects.get(pk=options['center'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Center {options['center']} does not exist.")
+
+        count = student_stats.rebuild(center=center, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {count} students."))
@@ -0,0 +1,54 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from attendance_tracker import jobs, timing
+
+logger = logging.getLogger('attendance_tracker.timing')
+
+
+def timed(generate):
+    """`generate`, logging its DB and AI time per center like RequestTimingMiddleware does per request."""
+    if not settings.REQUEST_TIMING:
+        return generate
+
+    def wrapper(center):
+        timings = timing.Timings(names=('db', 'ai'))
+        token = timing.activate(timings)
+        start = time.perf_counter()
+        try:
+            with timing.track_queries(timings):
+                return generate(center)
+        finally:
+            timing.deactivate(token)
+            logger.info(json.dumps({
+                "job": "insight",
+                "center": center.pk,
+                "queries": timings.queries,
+                "total_ms": round((time.perf_counter() - start) * 1000, 1),
+                **{f"{name}_ms": round(ms, 1) for name, ms in timings.durations.items()},
+            }))
+    return wrapper
+
+
+class Command(BaseCommand):
+    help = "Process queued insight jobs and store the result for each center."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when the queue is empty.")
+
+    def handle(self, *args, **options):
+        from attendance_tracker.utilities import insights
+
+        generate = timed(insights)
+        while True:
+            processed = jobs.run_pending(generate)
+            if processed:
+                self.stdout.write(f"Processed {processed} insight job(s).")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
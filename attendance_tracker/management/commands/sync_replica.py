@@ -0,0 +1,73 @@
+import sqlite3
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from attendance_tracker import caching
+from config.routers import REPLICA
+
+
+class Command(BaseCommand):
+    help = "Copy the default SQLite database onto the replica (a stand-in for replication)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Copy once and exit.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds between copies.")
+
+    def handle(self, *args, **options):
+        if REPLICA not in connections.databases:
+            raise CommandError("No replica database is configured; set REPLICA_DATABASE.")
+        source, target = connections['default'], connections[REPLICA]
+        if source.vendor != 'sqlite' or target.vendor != 'sqlite':
+            raise CommandError("sync_replica only copies SQLite databases; use the database's own replication.")
+
+        data_version, versions = None, None
+        while True:
+            start = time.perf_counter()
+            current = self.data_version(source)
+            if current != data_version:
+                versions = self.copy(source, target, versions)
+                data_version = current
+                self.stdout.write(f"Replica synced in {(time.perf_counter() - start) * 1000:.0f} ms.")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+    def data_version(self, source):
+        # Changes whenever another connection commits to the database.
+        with source.cursor() as cursor:
+            cursor.execute('PRAGMA data_version')
+            return cursor.fetchone()[0]
+
+    def copy(self, source, target, versions=None):
+        """Copy `source` onto `target`, then bump the centers whose data changed.
+
+        `versions` maps each center to its cache version as of the previous
+        copy. A write bumps its center's version, so a different version now
+        means pages may have been cached from the stale replica since then.
+        Without `versions` every center is bumped. Returns the new map; a
+        write that lands during this copy still shows up in the next one.
+        """
+        centers = get_user_model().objects.filter(teacher_user__isnull=True, student_user__isnull=True)
+        center_ids = list(centers.values_list('pk', flat=True))
+        before = {center_id: caching.version(center_id) for center_id in center_ids}
+
+        target.close()
+        source.ensure_connection()
+        replica = sqlite3.connect(target.settings_dict['NAME'])
+        try:
+            source.connection.backup(replica)
+        finally:
+            replica.close()
+
+        changed = [
+            center_id for center_id in center_ids
+            if versions is None or versions.get(center_id) != before[center_id]
+        ]
+        for center_id in changed:
+            caching.bump(center_id)
+            # Compare against our own bump next time, not the pre-copy version.
+            before[center_id] = caching.version(center_id)
+        return before
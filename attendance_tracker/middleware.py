@@ -0,0 +1,103 @@
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from attendance_tracker import timing
+
+logger = logging.getLogger('attendance_tracker.timing')
+
+
+class RequestTimingMiddleware:
+    """Report DB, view and template time for every request.
+
+    The totals go out as a Server-Timing header and one JSON log line per
+    request; queries slower than SLOW_QUERY_MS are logged with their SQL.
+    A streaming response's header can only cover the work done before its
+    body, so its log line is written once the body has been sent and counts
+    the queries run while streaming too. Enabled by REQUEST_TIMING.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = timing.Timings()
+        token = timing.activate(timings)
+        start = time.perf_counter()
+        try:
+            with timing.track_queries(timings):
+                response = self.get_response(request)
+            self.view_done(timings)
+        finally:
+            timing.deactivate(token)
+        return self.finish(request, response, timings, start)
+
+    async def __acall__(self, request):
+        timings = timing.Timings()
+        token = timing.activate(timings)
+        start = time.perf_counter()
+        try:
+            async with timing.atrack_queries(timings):
+                response = await self.get_response(request)
+            self.view_done(timings)
+        finally:
+            timing.deactivate(token)
+        return self.finish(request, response, timings, start)
+
+    def view_done(self, timings):
+        if timings.view_started is not None:
+            # Includes template and DB time, which are also reported on their own.
+            timings.add('view', time.perf_counter() - timings.view_started)
+
+    def finish(self, request, response, timings, start):
+        total = (time.perf_counter() - start) * 1000
+
+        streamed = response.streaming and not response.is_async
+        queries = f"{timings.queries} before the body" if streamed else timings.queries
+        response['Server-Timing'] = ", ".join(
+            [f'{name};dur={ms:.1f}' for name, ms in timings.durations.items()]
+            + [f'total;dur={total:.1f}', f'queries;desc="{queries}"']
+        )
+        if streamed:
+            response.streaming_content = self.stream(request, response, response.streaming_content, timings, start)
+        else:
+            self.log(request, response, timings, total)
+        return response
+
+    def stream(self, request, response, content, timings, start):
+        try:
+            with timing.track_queries(timings):
+                yield from content
+        finally:
+            self.log(request, response, timings, (time.perf_counter() - start) * 1000, streamed=True)
+
+    def log(self, request, response, timings, total, streamed=False):
+        logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "view": timings.view_name,
+            "status": response.status_code,
+            "queries": timings.queries,
+            "total_ms": round(total, 1),
+            **({"streamed": True} if streamed else {}),
+            **{f"{name}_ms": round(ms, 1) for name, ms in timings.durations.items()},
+        }))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = timing.current()
+        timings.view_name = request.resolver_match.view_name if request.resolver_match else view_func.__name__
+        timings.view_started = time.perf_counter()
+        return None
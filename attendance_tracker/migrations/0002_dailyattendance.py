@@ -0,0 +1,68 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_attendance(apps, schema_editor):
+    Attendance = apps.get_model('attendance_tracker', 'Attendance')
+    DailyAttendance = apps.get_model('attendance_tracker', 'DailyAttendance')
+    rows = (
+        Attendance.objects
+        .annotate(date=TruncDate('time'))
+        .values('center_id', 'course_id', 'date')
+        .annotate(present=Count('id', filter=Q(status=True)), total=Count('id'))
+        .order_by()
+    )
+    DailyAttendance.objects.bulk_create(
+        [
+            DailyAttendance(
+                center_id=row['center_id'],
+                course_id=row['course_id'],
+                date=row['date'],
+                present=row['present'],
+                absent=row['total'] - row['present'],
+                total=row['total'],
+            )
+            for row in rows.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance_tracker', '0001_initial'),
+        ('courses', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendance',
+            name='status',
+            field=models.BooleanField(default=False, verbose_name='Attendance status'),
+        ),
+        migrations.CreateModel(
+            name='DailyAttendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('center', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_attendance', to=settings.AUTH_USER_MODEL)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='courses.course')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['center', 'date'], name='daily_attendance_center_date')],
+                'constraints': [models.UniqueConstraint(fields=('center', 'course', 'date'), name='unique_daily_attendance')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_attendance, migrations.RunPython.noop),
+    ]
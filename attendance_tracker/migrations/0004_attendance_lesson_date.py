@@ -0,0 +1,69 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:18
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+CHUNK_SIZE = 2000
+
+
+def backfill_lesson_date(apps, schema_editor):
+    Attendance = apps.get_model('attendance_tracker', 'Attendance')
+    last_id = 0
+    while True:
+        chunk = list(
+            Attendance.objects.filter(id__gt=last_id, lesson_date__isnull=True)
+            .only('id', 'time').order_by('id')[:CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        for attendance in chunk:
+            attendance.lesson_date = timezone.localdate(attendance.time)
+        Attendance.objects.bulk_update(chunk, ['lesson_date'])
+        last_id = chunk[-1].id
+
+
+def remove_duplicates(apps, schema_editor):
+    # Earlier versions added a new set of rows every time a class was
+    # re-submitted; keep the latest mark per student, course and day.
+    Attendance = apps.get_model('attendance_tracker', 'Attendance')
+    DailyAttendance = apps.get_model('attendance_tracker', 'DailyAttendance')
+    duplicates = (
+        Attendance.objects.values('student_id', 'course_id', 'lesson_date')
+        .annotate(rows=Count('id'), keep=Max('id'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for group in duplicates.iterator():
+        stale = Attendance.objects.filter(
+            student_id=group['student_id'], course_id=group['course_id'], lesson_date=group['lesson_date'],
+        ).exclude(id=group['keep'])
+        days = set(stale.values_list('center_id', 'course_id', 'lesson_date'))
+        stale.delete()
+        for center_id, course_id, day in days:
+            totals = Attendance.objects.filter(center_id=center_id, course_id=course_id, lesson_date=day).aggregate(
+                present=Count('id', filter=Q(status=True)), total=Count('id'),
+            )
+            DailyAttendance.objects.filter(center_id=center_id, course_id=course_id, date=day).update(
+                present=totals['present'], absent=totals['total'] - totals['present'], total=totals['total'],
+            )
+
+
+class Migration(migrations.Migration):
+    # Each backfill chunk commits on its own so large tables are not
+    # rewritten in a single transaction.
+    atomic = False
+
+    dependencies = [
+        ('attendance_tracker', '0003_insight'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='lesson_date',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(backfill_lesson_date, migrations.RunPython.noop),
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:18
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance_tracker', '0004_attendance_lesson_date'),
+        ('courses', '0001_initial'),
+        ('students', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendance',
+            name='lesson_date',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+        migrations.RemoveConstraint(
+            model_name='attendance',
+            name='unique_attendance_record',
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['center', 'lesson_date'], name='attendance_center_date'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['course', 'lesson_date'], name='attendance_course_date'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', 'lesson_date'], name='attendance_student_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('student', 'course', 'lesson_date'), name='unique_attendance_per_day'),
+        ),
+    ]
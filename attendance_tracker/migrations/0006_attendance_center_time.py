@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance_tracker', '0005_attendance_lesson_date_indexes'),
+        ('courses', '0001_initial'),
+        ('students', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['center', '-time', '-id'], name='attendance_center_time'),
+        ),
+    ]
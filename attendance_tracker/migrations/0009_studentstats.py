@@ -0,0 +1,83 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+RECENT = 10
+BATCH_SIZE = 500
+
+
+def _stats(StudentStats, student_id, center_id, history):
+    # `history` is the student's (lesson_date, id, status), newest first.
+    statuses = [status for _, _, status in history]
+    present = sum(statuses)
+    return StudentStats(
+        student_id=student_id,
+        center_id=center_id,
+        total=len(statuses),
+        present=present,
+        absent=len(statuses) - present,
+        rate=present / len(statuses) * 100,
+        streak=next((i for i, status in enumerate(statuses) if status != statuses[0]), len(statuses)),
+        recent="".join("P" if status else "A" for status in statuses[:RECENT]),
+        last_lesson_date=history[0][0],
+    )
+
+
+def backfill_student_stats(apps, schema_editor):
+    # Same result as student_stats.rebuild, on the historical models, one
+    # batch of students at a time so only their records are in memory.
+    Student = apps.get_model('students', 'Student')
+    StudentStats = apps.get_model('attendance_tracker', 'StudentStats')
+    models_with_records = [
+        apps.get_model('attendance_tracker', name) for name in ('Attendance', 'ArchivedAttendance')
+    ]
+    last_id = 0
+    while True:
+        centers = dict(
+            Student.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', 'center_id')[:BATCH_SIZE]
+        )
+        if not centers:
+            break
+        last_id = max(centers)
+        histories = {}
+        for model in models_with_records:
+            rows = model.objects.filter(student_id__in=list(centers)).values_list('student_id', 'lesson_date', 'id', 'status')
+            for student_id, day, pk, status in rows.iterator():
+                histories.setdefault(student_id, []).append((day, pk, status))
+        StudentStats.objects.bulk_create([
+            _stats(StudentStats, student_id, centers[student_id], sorted(history, reverse=True))
+            for student_id, history in histories.items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance_tracker', '0008_idempotencykey'),
+        ('students', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentStats',
+            fields=[
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='students.student')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('rate', models.FloatField(default=0)),
+                ('streak', models.PositiveIntegerField(default=0)),
+                ('recent', models.CharField(blank=True, max_length=10)),
+                ('last_lesson_date', models.DateField(blank=True, null=True)),
+                ('center', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'student stats',
+                'indexes': [models.Index(fields=['center', 'rate'], name='student_stats_center_rate'), models.Index(fields=['center', 'absent', '-present'], name='student_stats_center_absent')],
+            },
+        ),
+        migrations.RunPython(backfill_student_stats, migrations.RunPython.noop),
+    ]
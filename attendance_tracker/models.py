@@ -1,6 +1,7 @@
 from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 from courses.models import Course
 from students.models import Student
@@ -9,6 +10,7 @@ from students.models import Student
 class Attendance(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     time = models.DateTimeField(auto_now_add=True)
+    lesson_date = models.DateField(default=timezone.localdate)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     status = models.BooleanField(verbose_name='Attendance status', default=False)
     center = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True)
@@ -18,10 +20,161 @@ class Attendance(models.Model):
     class Meta:
         constraints = [
             models.UniqueConstraint(
-                fields=['student', 'course', 'time'],
-                name='unique_attendance_record'
+                fields=['student', 'course', 'lesson_date'],
+                name='unique_attendance_per_day'
             )
         ]
+        indexes = [
+            models.Index(fields=['center', 'lesson_date'], name='attendance_center_date'),
+            models.Index(fields=['course', 'lesson_date'], name='attendance_course_date'),
+            models.Index(fields=['student', 'lesson_date'], name='attendance_student_date'),
+            models.Index(fields=['center', '-time', '-id'], name='attendance_center_time'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.first_name} {self.student.last_name} - {self.time} - {self.course} - {self.status}"
+
+class ArchivedAttendance(models.Model):
+    # Attendance rows older than ATTENDANCE_HOT_DAYS, moved here by
+    # archive_attendance with their original ids.
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='archived_attendance')
+    time = models.DateTimeField()
+    lesson_date = models.DateField()
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='archived_attendance')
+    status = models.BooleanField(verbose_name='Attendance status', default=False)
+    center = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, related_name='archived_attendance')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, related_name='+')
+    marked_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, related_name='+')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['center', '-time', '-id'], name='archived_center_time'),
+            models.Index(fields=['student', 'lesson_date'], name='archived_student_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.first_name} {self.student.last_name} - {self.time} - {self.course} - {self.status}"
+
+
+class ArchivedAttendanceSummary(models.Model):
+    # Per-student totals of the archived rows, so lifetime rates can add
+    # them to the live Attendance counts without reading the archive.
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='archived_summary')
+    total = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    last_lesson_date = models.DateField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.student} - {self.present}/{self.total}"
+
+
+class StudentStats(models.Model):
+    # Lifetime attendance of one student, archive included, kept current by
+    # attendance_tracker.student_stats in the transactions that write marks.
+    RECENT = 10
+
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    center = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, related_name='+')
+    total = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    rate = models.FloatField(default=0)
+    # Records in a row, up to the latest, with the latest record's status.
+    streak = models.PositiveIntegerField(default=0)
+    # The last RECENT statuses, newest first: "P" present, "A" absent.
+    recent = models.CharField(max_length=RECENT, blank=True)
+    last_lesson_date = models.DateField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'student stats'
+        indexes = [
+            models.Index(fields=['center', 'rate'], name='student_stats_center_rate'),
+            models.Index(fields=['center', 'absent', '-present'], name='student_stats_center_absent'),
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.present}/{self.total}"
+
+
+class IdempotencyKey(models.Model):
+    # One row per mark uploaded through the sync API, so a retried upload
+    # gets the original result back instead of being applied again.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=64)
+    result = models.CharField(max_length=10)
+    # sha256 of the mark the key was first used for (sync.fingerprint).
+    fingerprint = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_key_created'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.key} - {self.result}"
+
+
+class DailyAttendance(models.Model):
+    center = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, related_name='daily_attendance')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    date = models.DateField()
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['center', 'course', 'date'],
+                name='unique_daily_attendance'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['center', 'date'], name='daily_attendance_center_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.course} - {self.date} - {self.present}/{self.total}"
+
+
+class Insight(models.Model):
+    center = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='insight')
+    text = models.TextField(blank=True)
+    generated_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.center} - {self.generated_at}"
+
+
+class InsightJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+    center = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='insight_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='insight_job_queue'),
+        ]
 
     def __str__(self):
-        return f"{self.student.first_name} {self.student.last_name} - {self.time} - {self.course} - {self.status}"
\ No newline at end of file
+        return f"{self.center} - {self.status} - {self.created_at}"
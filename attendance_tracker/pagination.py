@@ -0,0 +1,105 @@
+import base64
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def _json_default(value):
+    # Full isoformat: DjangoJSONEncoder drops microseconds, which would make
+    # the cursor skip rows whose timestamps differ only below a millisecond.
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor.")
+
+
+def encode_cursor(values):
+    data = json.dumps(values, default=_json_default).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+
+
+def cursor_values(qs, fields, cursor):
+    """The values of `cursor` converted to the types of `fields`, or None.
+
+    Cursors come back from the client, so one that doesn't decode to one
+    value of the right type per field is treated as no cursor at all.
+    """
+    values = decode_cursor(cursor)
+    if not isinstance(values, list) or len(values) != len(fields):
+        return None
+    converted = []
+    for field, value in zip(fields, values):
+        if value is None or isinstance(value, (list, dict)):
+            return None
+        annotation = qs.query.annotations.get(field)
+        output = annotation.output_field if annotation is not None else qs.model._meta.get_field(field)
+        try:
+            value = output.to_python(value)
+        except (ValidationError, ValueError, TypeError):
+            return None
+        converted.append(value)
+    return converted
+
+
+def keyset_filter(fields, values, descending):
+    # (a, b) < (x, y) expands to: a < x OR (a = x AND b < y)
+    lookup = 'lt' if descending else 'gt'
+    condition = Q()
+    for i, field in enumerate(fields):
+        step = Q(**{f'{field}__{lookup}': values[i]})
+        for previous, value in zip(fields[:i], values[:i]):
+            step &= Q(**{previous: value})
+        condition |= step
+    return condition
+
+
+def keyset_page(qs, fields, cursor=None, size=25, descending=True):
+    """Return (rows, next_cursor) for the page that starts after `cursor`.
+
+    `fields` must end with a unique column so the ordering is total; rows
+    may be model instances or dicts from values().
+    """
+    values = cursor_values(qs, fields, cursor) if cursor else None
+    if values is not None:
+        qs = qs.filter(keyset_filter(fields, values, descending))
+    ordering = [f'-{field}' if descending else field for field in fields]
+    rows = list(qs.order_by(*ordering)[:size + 1])
+
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        last = rows[-1]
+        next_cursor = encode_cursor([
+            last[field] if isinstance(last, dict) else getattr(last, field) for field in fields
+        ])
+    return rows, next_cursor
+
+
+def list_page(qs, params, sorts, default, search=(), size=25):
+    """Search, sort and keyset-page a list view from its GET `params`.
+
+    `sorts` maps a sort name to its keyset fields; `search` lists the columns
+    matched by `q`. Returns (rows, next_cursor, state) where `state` holds the
+    normalized q/sort/order for the template.
+    """
+    q = params.get('q', '').strip()
+    if q and search:
+        match = Q()
+        for field in search:
+            match |= Q(**{f'{field}__icontains': q})
+        qs = qs.filter(match)
+
+    sort = params.get('sort') if params.get('sort') in sorts else default
+    order = 'desc' if params.get('order') == 'desc' else 'asc'
+    rows, next_cursor = keyset_page(
+        qs, sorts[sort], cursor=params.get('cursor'), size=size, descending=order == 'desc',
+    )
+    return rows, next_cursor, {'q': q, 'sort': sort, 'order': order}
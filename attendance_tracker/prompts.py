@@ -0,0 +1,129 @@
+"""The zedAI insight prompt, built from per-student summaries instead of raw records.
+
+Everything the model sees comes from StudentStats: the last RECENT records
+of each student, their lifetime rate and the trend between the two. The
+student lines are capped by INSIGHT_PROMPT_CHARS, so the prompt stays the
+same size however much history a center has.
+"""
+from django.conf import settings
+
+from attendance_tracker.models import StudentStats
+
+RECENT = 4
+LOW_RATE = 70
+OMITTED = "... and {} more students not shown."
+
+HEADER = """
+You are an assistant that analyzes attendance data.
+ONLY use the data below, do not invent or assume values.
+
+Each line is one student: name, their last {recent} records (P = present, A = absent,
+newest first) with the rate over those records, the overall rate over all their
+records, and the change from the overall rate to the recent one.
+
+Here is attendance data:
+"""
+
+FOOTER = """
+Tasks:
+1. Highlight students with attendance below {low_rate}% in last {recent} records.
+2. Give essential highlights.
+
+Rules:
+- Use ONLY the attendance data provided.
+- Do not add extra comments or make up information.
+- If data is missing, say "Not enough data".
+- Don't change the percentages ({predicted_rate} and {last_week_rate}), which are provided in the text.
+- Follow exactly this format:
+
+<b>Attendance report:</b><br>
+<span style="color: var(--main-color);"><b>-</b></span> Attendance rate for last week: <span style="color: var(--main-color);"><b>{last_week_rate}%</b></span><br>
+<span style="color: var(--main-color);"><b>-</b></span> Predicted attendance rate for next week: <span style="color: var(--main-color);"><b>{predicted_rate}%</b></span><br>
+<b>Essential highlights:</b><br>
+<span style="color: var(--main-color);"><b>-</b></span> first highlight.<br>
+<span style="color: var(--main-color);"><b>-</b></span> second highlight.<br>
+<span style="color: var(--main-color);"><b>-</b></span> third highlight.<br>
+"""
+
+
+def student_summaries(center, last=RECENT):
+    """One dict per student with records, ordered lowest recent rate first.
+
+    Read from StudentStats, so the overall figures are lifetime ones,
+    archive included, as everywhere else in the app.
+    """
+    stats = (
+        StudentStats.objects.filter(center=center, total__gt=0)
+        .values_list('student_id', 'student__first_name', 'student__last_name', 'recent', 'total', 'present', 'rate')
+    )
+    summaries = []
+    for student_id, first_name, last_name, recent, total, present, rate in stats:
+        statuses = [code == "P" for code in recent[:last]]
+        recent_rate = sum(statuses) / len(statuses) * 100 if statuses else 0
+        summaries.append({
+            "id": student_id,
+            "name": f"{first_name} {last_name}",
+            "recent": statuses,
+            "recent_rate": recent_rate,
+            "rate": rate,
+            "trend": recent_rate - rate,
+            "total": total,
+            "present": present,
+        })
+    # Fixed order, so truncation always drops the same students for the same data.
+    summaries.sort(key=lambda s: (s['recent_rate'], s['rate'], s['id']))
+    return summaries
+
+
+def summary_line(summary):
+    marks = " ".join("P" if status else "A" for status in summary['recent'])
+    return (
+        f"{summary['name']} (#{summary['id']}): last {len(summary['recent'])}: {marks} "
+        f"({summary['recent_rate']:.0f}%), overall {summary['rate']:.1f}% of {summary['total']}, "
+        f"trend {summary['trend']:+.1f}"
+    )
+
+
+def fit_lines(lines, budget):
+    """As many leading lines as fit in `budget` characters, plus a note about the rest.
+
+    Each line is counted with its newline. The note is left out too when
+    not even it fits.
+    """
+    kept, used = [], 0
+    for index, line in enumerate(lines):
+        rest = len(lines) - index - 1
+        # Leave room for the note that follows if this is not the last line.
+        reserve = len(OMITTED.format(rest)) + 1 if rest else 0
+        if used + len(line) + 1 + reserve > budget:
+            note = OMITTED.format(rest + 1)
+            if used + len(note) + 1 <= budget:
+                kept.append(note)
+            break
+        kept.append(line)
+        used += len(line) + 1
+    return kept
+
+
+def build_prompt(center, forecast, budget=None):
+    """(prompt, facts) for `center`; `forecast` is utilities.predicted_attendance's [predicted, last week]."""
+    budget = settings.INSIGHT_PROMPT_CHARS if budget is None else budget
+    predicted_rate, last_week_rate = round(forecast[0], 2), round(forecast[1], 2)
+    summaries = student_summaries(center)
+
+    header = HEADER.format(recent=RECENT)
+    footer = FOOTER.format(
+        recent=RECENT, low_rate=LOW_RATE, predicted_rate=predicted_rate, last_week_rate=last_week_rate,
+    )
+    lines = fit_lines([summary_line(s) for s in summaries], max(budget - len(header) - len(footer), 0))
+    prompt = header + "\n".join(lines + [footer])
+
+    records = sum(s['total'] for s in summaries)
+    facts = {
+        "predicted_rate": predicted_rate,
+        "last_week_rate": last_week_rate,
+        "overall_rate": sum(s['present'] for s in summaries) / records * 100 if records else 0,
+        "records": records,
+        "low_students": sorted(s['name'] for s in summaries if s['recent_rate'] < LOW_RATE),
+    }
+    return prompt, facts
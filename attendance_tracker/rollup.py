@@ -0,0 +1,102 @@
+from itertools import chain
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from attendance_tracker import caching
+from attendance_tracker.models import ArchivedAttendance, Attendance, DailyAttendance
+
+
+def record_marks(center, course, day, present=0, absent=0):
+    # Must run inside the transaction that writes the Attendance rows,
+    # so the counters never drift from the table they summarize.
+    row, created = DailyAttendance.objects.get_or_create(
+        center=center, course=course, date=day,
+        defaults={'present': present, 'absent': absent, 'total': present + absent},
+    )
+    if not created:
+        DailyAttendance.objects.filter(pk=row.pk).update(
+            present=F('present') + present,
+            absent=F('absent') + absent,
+            total=F('total') + present + absent,
+            updated_at=timezone.now(),
+        )
+
+
+def daily_counts(records):
+    return (
+        records
+        .values('center_id', 'course_id', 'lesson_date')
+        .annotate(
+            present=Count('id', filter=Q(status=True)),
+            total=Count('id'),
+        )
+        .order_by()
+    )
+
+
+def forget(records):
+    # Takes `records` (Attendance or ArchivedAttendance) out of the rollup;
+    # call it in the transaction that deletes them, before the delete.
+    now = timezone.now()
+    for row in daily_counts(records):
+        rollups = DailyAttendance.objects.filter(
+            center_id=row['center_id'], course_id=row['course_id'], date=row['lesson_date'],
+        )
+        rollups.update(
+            present=F('present') - row['present'],
+            absent=F('absent') - (row['total'] - row['present']),
+            total=F('total') - row['total'],
+            updated_at=now,
+        )
+        rollups.filter(total=0).delete()
+        caching.bump(row['center_id'])
+
+
+def rebuild(center=None, batch_size=1000):
+    attendances = Attendance.objects.all()
+    archived = ArchivedAttendance.objects.all()
+    rollups = DailyAttendance.objects.all()
+    if center is not None:
+        attendances = attendances.filter(center=center)
+        archived = archived.filter(center=center)
+        rollups = rollups.filter(center=center)
+
+    # Archived days still count; a day is normally only in one of the two tables.
+    days = {}
+    for row in chain(daily_counts(archived).iterator(), daily_counts(attendances).iterator()):
+        key = (row['center_id'], row['course_id'], row['lesson_date'])
+        present, total = days.get(key, (0, 0))
+        days[key] = (present + row['present'], total + row['total'])
+
+    with transaction.atomic():
+        rollups.delete()
+        created = DailyAttendance.objects.bulk_create(
+            (
+                DailyAttendance(
+                    center_id=center_id,
+                    course_id=course_id,
+                    date=day,
+                    present=present,
+                    absent=total - present,
+                    total=total,
+                )
+                for (center_id, course_id, day), (present, total) in days.items()
+            ),
+            batch_size=batch_size,
+        )
+        for center_id in {center_id for center_id, _, _ in days}:
+            caching.bump(center_id)
+    return len(created)
+
+
+def trend(rollups, start=None, end=None):
+    if start and end:
+        rollups = rollups.filter(date__range=(start, end))
+    rows = rollups.values('date').annotate(count=Sum('total')).order_by('date')
+    return {
+        "labels": [row["date"].strftime("%Y-%m-%d") for row in rows],
+        "values": [row["count"] for row in rows],
+    }
+
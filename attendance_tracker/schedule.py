@@ -0,0 +1,30 @@
+from django.db.models import Exists, OuterRef
+
+from attendance_tracker import caching
+from attendance_tracker.models import Attendance
+
+TIMEOUT = 60 * 60 * 24
+
+
+def courses_for_day(courses, day):
+    """`courses` running on `day`, each with `marked` set if attendance exists for that day."""
+    marked = Attendance.objects.filter(course=OuterRef('pk'), lesson_date=day)
+    return (
+        courses
+        .on_weekday(day)
+        .select_related('course_teacher')
+        .annotate(marked=Exists(marked))
+        .order_by('id')
+    )
+
+
+def today_courses(center_id, owner_id, courses, day):
+    """Cached courses_for_day() for one center or teacher (`owner_id`).
+
+    Dropped whenever the center's data changes, which includes a course
+    being edited and a class being marked.
+    """
+    return caching.get_or_compute(
+        center_id, f"today-courses:{owner_id}:{day.isoformat()}",
+        lambda: list(courses_for_day(courses, day)), timeout=TIMEOUT,
+    )
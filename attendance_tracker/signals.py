@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from attendance_tracker import caching, rollup
+from attendance_tracker.models import ArchivedAttendance, Attendance
+from courses.models import Course
+from students.models import Student
+from teachers.models import Teacher
+
+
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=Teacher)
+# No post_delete for Attendance: a listener would stop Django from
+# fast-deleting a student's rows on cascade, and the cascading Student or
+# Course delete already bumps the version.
+@receiver(post_save, sender=Attendance)
+def bump_center_version(sender, instance, **kwargs):
+    caching.bump(instance.center_id)
+
+
+@receiver(pre_delete, sender=Student)
+def forget_student_attendance(sender, instance, **kwargs):
+    # The student's rows go on cascade without signals; their StudentStats
+    # row cascades too, but the daily rollup is shared with classmates.
+    rollup.forget(Attendance.objects.filter(student=instance))
+    rollup.forget(ArchivedAttendance.objects.filter(student=instance))
@@ -0,0 +1,172 @@
+"""Per-student attendance statistics (StudentStats) instead of a GROUP BY per page.
+
+Whatever writes Attendance rows calls record_marks in the same transaction,
+after the rows are written, as with rollup.record_marks. New marks for a
+student's latest day only touch the counters, `recent` and `streak`. A
+corrected status, or a mark for an earlier day, re-reads that student's
+records instead. rebuild recomputes everything from the live table, the
+archive and ArchivedAttendanceSummary.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from attendance_tracker import caching
+from attendance_tracker.models import ArchivedAttendance, ArchivedAttendanceSummary, Attendance, StudentStats
+from students.models import Student
+
+RECENT = StudentStats.RECENT
+FIELDS = ['total', 'present', 'absent', 'rate', 'streak', 'recent', 'last_lesson_date']
+
+
+def _code(status):
+    return "P" if status else "A"
+
+
+def _set_rate(row):
+    row.rate = row.present / row.total * 100 if row.total else 0
+
+
+def _set_history(row, statuses):
+    # `statuses` are the student's records, newest first.
+    row.recent = "".join(_code(status) for status in statuses[:RECENT])
+    row.streak = next((i for i, status in enumerate(statuses) if status != statuses[0]), len(statuses))
+
+
+def _statuses(model, student_ids):
+    """({student_id: [status, ...]} newest first, {student_id: last lesson date}) from `model`."""
+    rows = (
+        model.objects.filter(student_id__in=student_ids)
+        .order_by('student_id', '-lesson_date', '-id')
+        .values_list('student_id', 'lesson_date', 'status')
+    )
+    statuses, last = defaultdict(list), {}
+    for student_id, day, status in rows:
+        statuses[student_id].append(status)
+        last.setdefault(student_id, day)
+    return statuses, last
+
+
+def _histories(student_ids):
+    """(live statuses, live + archived statuses, last lesson dates) of `student_ids`, newest first.
+
+    Archived records are all older than the live ones, so the archive is only
+    read for students whose live records are too few to fill `recent` or are
+    all one streak.
+    """
+    live, last = _statuses(Attendance, student_ids)
+    histories = {student_id: list(live[student_id]) for student_id in student_ids}
+    unsettled = [
+        student_id for student_id, statuses in histories.items()
+        if len(statuses) < RECENT or len(set(statuses)) < 2
+    ]
+    if unsettled:
+        archived, archived_last = _statuses(ArchivedAttendance, unsettled)
+        for student_id in unsettled:
+            histories[student_id] += archived[student_id]
+            if student_id not in last and student_id in archived_last:
+                last[student_id] = archived_last[student_id]
+    return live, histories, last
+
+
+def build(centers):
+    """Unsaved StudentStats for the students in `centers` ({student_id: center_id}) that have records."""
+    live, histories, last = _histories(list(centers))
+    archived = {
+        summary.student_id: summary
+        for summary in ArchivedAttendanceSummary.objects.filter(student_id__in=list(centers))
+    }
+    rows = []
+    for student_id, center_id in centers.items():
+        statuses, summary = live[student_id], archived.get(student_id)
+        total = len(statuses) + (summary.total if summary else 0)
+        if not total:
+            continue
+        present = sum(statuses) + (summary.present if summary else 0)
+        row = StudentStats(
+            student_id=student_id, center_id=center_id,
+            total=total, present=present, absent=total - present, last_lesson_date=last.get(student_id),
+        )
+        _set_rate(row)
+        _set_history(row, histories[student_id])
+        rows.append(row)
+    return rows
+
+
+def record_marks(center, marks):
+    """Update the stats of the students in `marks` after their Attendance rows are written.
+
+    `marks` are (student_id, lesson_date, status, previous status) tuples,
+    with None as the previous status of a new record.
+    """
+    by_student = defaultdict(list)
+    for mark in marks:
+        by_student[mark[0]].append(mark)
+    if not by_student:
+        return
+
+    rows = {row.student_id: row for row in StudentStats.objects.select_for_update().filter(student_id__in=list(by_student))}
+    reread = set()
+    for student_id, student_marks in by_student.items():
+        row = rows.get(student_id)
+        if row is None:
+            continue
+        for _, day, status, previous in sorted(student_marks, key=lambda mark: mark[1]):
+            if previous is None:
+                row.total += 1
+                row.present += status
+                row.absent += not status
+                if row.last_lesson_date is None or day >= row.last_lesson_date:
+                    row.streak = row.streak + 1 if row.recent[:1] == _code(status) else 1
+                    row.recent = (_code(status) + row.recent)[:RECENT]
+                    row.last_lesson_date = day
+                    continue
+            elif previous != status:
+                row.present += 1 if status else -1
+                row.absent += -1 if status else 1
+            else:
+                continue
+            reread.add(student_id)
+        _set_rate(row)
+
+    if reread:
+        _, histories, _ = _histories(list(reread))
+        for student_id in reread:
+            _set_history(rows[student_id], histories[student_id])
+    StudentStats.objects.bulk_update(list(rows.values()), FIELDS)
+    # A student's first stats row is built from everything they have.
+    StudentStats.objects.bulk_create(build({
+        student_id: center.pk for student_id in by_student if student_id not in rows
+    }))
+
+
+def refresh(student_ids):
+    """Recompute the stats of `student_ids` from their records, for changes made outside record_marks."""
+    centers = dict(Student.objects.filter(pk__in=list(student_ids)).values_list('pk', 'center_id'))
+    StudentStats.objects.filter(student_id__in=list(student_ids)).delete()
+    StudentStats.objects.bulk_create(build(centers))
+
+
+def rebuild(center=None, batch_size=1000):
+    students = Student.objects.all()
+    stats = StudentStats.objects.all()
+    if center is not None:
+        students = students.filter(center=center)
+        stats = stats.filter(center=center)
+
+    created = 0
+    centers = set()
+    with transaction.atomic():
+        stats.delete()
+        batch = {}
+        for student_id, center_id in students.order_by('pk').values_list('pk', 'center_id').iterator():
+            batch[student_id] = center_id
+            centers.add(center_id)
+            if len(batch) == batch_size:
+                created += len(StudentStats.objects.bulk_create(build(batch), batch_size=batch_size))
+                batch = {}
+        if batch:
+            created += len(StudentStats.objects.bulk_create(build(batch), batch_size=batch_size))
+        for center_id in centers:
+            caching.bump(center_id)
+    return created
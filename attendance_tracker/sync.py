@@ -0,0 +1,220 @@
+"""Batch marking for the offline sync API (views.sync_marks).
+
+A device queues marks while offline and uploads them in one request:
+
+    {"marks": [{"key": "<client id>", "course": 3, "student": 41,
+                "date": "2025-03-14", "status": "present"}, ...]}
+
+Every mark carries a client-generated key. Applied keys are stored in
+IdempotencyKey with a fingerprint of their mark, so uploading the same
+batch again reports the original results and writes nothing, while a key
+reused for a different mark is an error. Keys are kept for
+IDEMPOTENCY_KEY_DAYS.
+"""
+import hashlib
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from attendance_tracker import archive, caching, rollup, student_stats
+from attendance_tracker.history import parse_date
+from attendance_tracker.models import Attendance, IdempotencyKey
+from courses.models import Course
+from students.models import Student
+
+MAX_MARKS = 500
+STATUSES = {'present': True, 'absent': False}
+
+
+def parse_mark(entry, today, horizon):
+    """(mark, None) for a well-formed entry, or (None, error message).
+
+    Dates before `horizon` belong to the archive, which marks cannot change.
+    """
+    if not isinstance(entry, dict):
+        return None, "Each mark must be an object."
+    key = entry.get('key')
+    if not isinstance(key, str) or not 0 < len(key) <= 64:
+        return None, "key must be a string of 1 to 64 characters."
+    course, student = entry.get('course'), entry.get('student')
+    if type(course) is not int or type(student) is not int:
+        return None, "course and student must be ids."
+    day = parse_date(entry.get('date'))
+    if day is None:
+        return None, "date must be YYYY-MM-DD."
+    if day > today:
+        return None, "date is in the future."
+    if day < horizon:
+        return None, f"date is before {horizon.isoformat()}, the oldest day that can still be marked."
+    if entry.get('status') not in STATUSES:
+        return None, "status must be \"present\" or \"absent\"."
+    return {'key': key, 'course': course, 'student': student, 'date': day, 'status': STATUSES[entry['status']]}, None
+
+
+def fingerprint(mark):
+    return hashlib.sha256(
+        f"{mark['course']}:{mark['student']}:{mark['date'].isoformat()}:{mark['status']}".encode()
+    ).hexdigest()
+
+
+def key_cutoff():
+    return timezone.now() - timedelta(days=settings.IDEMPOTENCY_KEY_DAYS)
+
+
+def prune_keys(user=None):
+    """Delete idempotency keys older than IDEMPOTENCY_KEY_DAYS; returns how many."""
+    keys = IdempotencyKey.objects.filter(created_at__lt=key_cutoff())
+    if user is not None:
+        keys = keys.filter(user=user)
+    return keys.delete()[0]
+
+
+def allowed_students(user, role, marks):
+    """{(student_id, course_id): student} for the marks `user` may write, in one query."""
+    students = Student.objects.filter(
+        pk__in={mark['student'] for mark in marks},
+        course_id__in={mark['course'] for mark in marks},
+    ).select_related('course__course_teacher')
+    if role == 'teacher':
+        students = students.filter(course__course_teacher__user=user)
+    else:
+        students = students.filter(center=user)
+    return {(student.pk, student.course_id): student for student in students}
+
+
+def apply_marks(user, role, center, entries):
+    """Validate and write `entries` for `user`, with request.role `role` and request.center `center`.
+
+    Returns one result dict per entry, in order. Each result has the entry's
+    key and a `result` of "created", "updated", "unchanged" or "error" (with
+    an `error` message). Results replayed from an earlier upload also have
+    `"replayed": true`.
+    """
+    today, horizon = timezone.localdate(), archive.horizon()
+    results = [None] * len(entries)
+    marks = {}
+
+    for index, entry in enumerate(entries):
+        mark, error = parse_mark(entry, today, horizon)
+        if error:
+            key = entry.get('key') if isinstance(entry, dict) else None
+            results[index] = {"key": key, "result": "error", "error": error}
+        else:
+            marks[index] = mark
+
+    # Only the first use of a key in a batch counts, on every upload of it.
+    seen = set()
+    for index, mark in list(marks.items()):
+        if mark['key'] in seen:
+            results[index] = {"key": mark['key'], "result": "error", "error": "Duplicate key in this batch."}
+            del marks[index]
+        seen.add(mark['key'])
+
+    prune_keys(user)
+    if not marks:
+        return results
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                return _apply(user, role, center, dict(marks), list(results))
+        except IntegrityError:
+            # A concurrent upload added one of these marks or keys after we
+            # read; the second pass replays or corrects them instead.
+            if attempt:
+                raise
+
+
+def _existing_marks(marks):
+    return {
+        (a.student_id, a.course_id, a.lesson_date): a
+        for a in Attendance.objects.select_for_update().filter(
+            student_id__in={mark['student'] for mark in marks},
+            course_id__in={mark['course'] for mark in marks},
+            lesson_date__in={mark['date'] for mark in marks},
+        )
+    }
+
+
+def _apply(user, role, center, marks, results):
+    # Uploads touching the same courses queue on their rows, as in
+    # marking(), so the keys read below include any upload that committed
+    # first. (On SQLite the IMMEDIATE transaction already serializes them.)
+    list(Course.objects.select_for_update().filter(
+        pk__in={mark['course'] for mark in marks.values()}
+    ).order_by('pk').values_list('pk'))
+    stored = {
+        key: (result, stored_fingerprint)
+        for key, result, stored_fingerprint in IdempotencyKey.objects.filter(
+            user=user, key__in={mark['key'] for mark in marks.values()}
+        ).values_list('key', 'result', 'fingerprint')
+    }
+    for index, mark in list(marks.items()):
+        if mark['key'] in stored:
+            result, stored_fingerprint = stored[mark['key']]
+            # Keys stored before fingerprints existed have an empty one.
+            if stored_fingerprint and stored_fingerprint != fingerprint(mark):
+                results[index] = {"key": mark['key'], "result": "error", "error": "Key was already used for a different mark."}
+            else:
+                results[index] = {"key": mark['key'], "result": result, "replayed": True}
+            del marks[index]
+
+    students = allowed_students(user, role, marks.values()) if marks else {}
+    for index, mark in list(marks.items()):
+        if (mark['student'], mark['course']) not in students:
+            results[index] = {"key": mark['key'], "result": "error", "error": "Student is not in one of your courses."}
+            del marks[index]
+
+    if not marks:
+        return results
+
+    existing = _existing_marks(marks.values())
+    created, updated, previous = [], {}, {}
+    counts = defaultdict(lambda: [0, 0])
+    keys = []
+    for index, mark in marks.items():
+        student = students[(mark['student'], mark['course'])]
+        slot = (mark['student'], mark['course'], mark['date'])
+        status = mark['status']
+        attendance = existing.get(slot)
+        if attendance is None:
+            attendance = Attendance(
+                student=student, course=student.course, lesson_date=mark['date'], status=status,
+                center=center, user_id=student.course.course_teacher.user_id, marked_by=user,
+            )
+            existing[slot] = attendance
+            created.append(attendance)
+            counts[(student.course, mark['date'])][0 if status else 1] += 1
+            result = "created"
+        elif attendance.status != status:
+            if attendance.pk is not None:
+                previous.setdefault(attendance.pk, attendance.status)
+                updated[attendance.pk] = attendance
+            attendance.status = status
+            attendance.marked_by = user
+            present, absent = counts[(student.course, mark['date'])]
+            counts[(student.course, mark['date'])] = [
+                present + (1 if status else -1), absent + (-1 if status else 1),
+            ]
+            result = "updated"
+        else:
+            result = "unchanged"
+        results[index] = {"key": mark['key'], "result": result}
+        keys.append(IdempotencyKey(user=user, key=mark['key'], result=result, fingerprint=fingerprint(mark)))
+
+    Attendance.objects.bulk_create(created)
+    Attendance.objects.bulk_update(list(updated.values()), ['status', 'marked_by'])
+    for (course, day), (present, absent) in counts.items():
+        if present or absent:
+            rollup.record_marks(center, course, day, present=present, absent=absent)
+    student_stats.record_marks(center, [
+        (a.student_id, a.lesson_date, a.status, None) for a in created
+    ] + [
+        (a.student_id, a.lesson_date, a.status, previous[pk]) for pk, a in updated.items()
+    ])
+    IdempotencyKey.objects.bulk_create(keys)
+    if created or updated:
+        caching.bump(center.pk)
+    return results
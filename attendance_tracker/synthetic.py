@@ -0,0 +1,143 @@
+"""Schedule-consistent fake data for load testing and benchmarks.
+
+Everything is inserted with bulk_create, so model save() and signals do
+not run; the schedule table, the daily rollup, the student stats and the
+per-center cache version are maintained here instead.
+"""
+import random
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from attendance_tracker import caching, rollup, student_stats
+from attendance_tracker.models import Attendance
+from courses.models import WEEKDAYS, Course, CourseSchedule
+from students.models import Student
+from teachers.models import Teacher
+
+FIRST_NAMES = [
+    'Aziz', 'Bekzod', 'Dilnoza', 'Farrux', 'Gulnora', 'Jasur', 'Kamola', 'Laylo',
+    'Madina', 'Nodir', 'Otabek', 'Rustam', 'Sardor', 'Shahzoda', 'Timur', 'Zarina',
+]
+LAST_NAMES = [
+    'Abdullayev', 'Karimov', 'Rahimova', 'Tursunov', 'Yusupova', 'Ergashev',
+    'Nazarova', 'Qodirov', 'Saidova', 'Xolmatov', 'Usmonov', 'Mirzayeva',
+]
+
+
+def _batches(objs, size):
+    objs = iter(objs)
+    while batch := list(islice(objs, size)):
+        yield batch
+
+
+def _person(rng):
+    return {
+        'first_name': rng.choice(FIRST_NAMES),
+        'last_name': rng.choice(LAST_NAMES),
+        'phone_number': f"+998{rng.randint(900000000, 999999999)}",
+    }
+
+
+def _users(prefix, usernames, password):
+    User.objects.bulk_create(User(username=f"{prefix}-{name}", password=password) for name in usernames)
+    return list(User.objects.filter(username__in=[f"{prefix}-{name}" for name in usernames]).order_by('id'))
+
+
+def _attendance(rng, center, courses, students_by_course, days, today):
+    propensity = {
+        student.pk: rng.uniform(0.55, 0.98)
+        for students in students_by_course.values() for student in students
+    }
+    tz = timezone.get_current_timezone()
+    for offset in range(days, 0, -1):
+        day = today - timedelta(days=offset)
+        for course, weekdays in courses:
+            if day.weekday() not in weekdays:
+                continue
+            marked_at = timezone.make_aware(datetime.combine(day, course.course_time), tz)
+            teacher_user = course.course_teacher.user
+            for student in students_by_course[course.pk]:
+                yield Attendance(
+                    student=student, course=course, lesson_date=day, time=marked_at,
+                    status=rng.random() < propensity[student.pk],
+                    center=center, user=teacher_user, marked_by=teacher_user,
+                )
+
+
+def generate(centers=1, teachers=5, students=100, days=30, courses_per_teacher=2, seed=0,
+             prefix='synth', password='synthetic', batch_size=2000):
+    """Create `centers` centers, each with `teachers` teachers, `students` students
+    and `days` days of attendance up to yesterday. The same seed gives the same data.
+
+    Returns a dict of row counts.
+    """
+    rng = random.Random(seed)
+    password = make_password(password)
+    today = timezone.localdate()
+    counts = {'centers': 0, 'teachers': 0, 'courses': 0, 'students': 0, 'attendance': 0}
+
+    for c in range(centers):
+        with transaction.atomic():
+            center = _users(prefix, [f"center-{c}"], password)[0]
+
+            teacher_users = _users(prefix, [f"c{c}-teacher-{t}" for t in range(teachers)], password)
+            teacher_rows = Teacher.objects.bulk_create(
+                Teacher(center=center, user=user, **_person(rng)) for user in teacher_users
+            )
+
+            courses = []
+            for teacher in teacher_rows:
+                for n in range(courses_per_teacher):
+                    days_of_week = sorted(rng.sample(range(7), rng.choice([2, 3])))
+                    courses.append((
+                        Course(
+                            course_name=f"{rng.choice(['English', 'Math', 'IELTS', 'Python', 'Physics'])} {len(courses) + 1}",
+                            course_teacher=teacher,
+                            course_time=time(rng.randint(8, 19), rng.choice([0, 30])),
+                            days=[WEEKDAYS[d] for d in days_of_week],
+                            description="Generated course",
+                            center=center,
+                        ),
+                        days_of_week,
+                    ))
+            Course.objects.bulk_create([course for course, _ in courses])
+            CourseSchedule.objects.bulk_create(
+                CourseSchedule(course=course, weekday=d) for course, weekdays in courses for d in weekdays
+            )
+
+            student_users = _users(prefix, [f"c{c}-student-{s}" for s in range(students)], password)
+            student_rows = Student.objects.bulk_create(
+                Student(
+                    center=center, user=user, course=rng.choice(courses)[0],
+                    gender=rng.choice(['M', 'F']), **_person(rng),
+                )
+                for user in student_users
+            )
+            students_by_course = {course.pk: [] for course, _ in courses}
+            for student in student_rows:
+                students_by_course[student.course_id].append(student)
+
+            for batch in _batches(_attendance(rng, center, courses, students_by_course, days, today), batch_size):
+                # Attendance.time is auto_now_add, which bulk_create applies;
+                # put the lesson times back afterwards.
+                times = [attendance.time for attendance in batch]
+                Attendance.objects.bulk_create(batch)
+                for attendance, marked_at in zip(batch, times):
+                    attendance.time = marked_at
+                Attendance.objects.bulk_update(batch, ['time'])
+                counts['attendance'] += len(batch)
+
+            rollup.rebuild(center=center, batch_size=batch_size)
+            student_stats.rebuild(center=center, batch_size=batch_size)
+            caching.bump(center.pk)
+
+        counts['centers'] += 1
+        counts['teachers'] += len(teacher_rows)
+        counts['courses'] += len(courses)
+        counts['students'] += len(student_rows)
+    return counts
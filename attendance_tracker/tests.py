@@ -1,3 +1,851 @@
-from django.test import TestCase
+import importlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+
+from django.apps import apps
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import path, reverse
+from django.utils import timezone
+
+from attendance_tracker import (
+    ai, analytics, archive, caching, jobs, prompts, rollup, schedule, student_stats, sync, synthetic, timing, utilities,
+    views,
+)
+from attendance_tracker.middleware import RequestTimingMiddleware
+from attendance_tracker.management.commands import run_insight_worker, sync_replica
+from attendance_tracker.exports import export_attendance, export_students
+from attendance_tracker.history import COLUMNS as HISTORY_COLUMNS, filter_history, history_page, serialize_row
+from attendance_tracker.pagination import encode_cursor
+from attendance_tracker.models import (
+    ArchivedAttendance, ArchivedAttendanceSummary, Attendance, DailyAttendance, IdempotencyKey, Insight, InsightJob,
+    StudentStats,
+)
+from courses.models import WEEKDAYS, Course
+from students.models import Student
+from config import routers, urls
+from teachers.models import Teacher
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CenterTestCase(TestCase):
+    """A center with one teacher, one daily course and a few students."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.center = User.objects.create_user('center', password='pw')
+        cls.teacher = Teacher.objects.create(
+            first_name='T', last_name='One', phone_number='1', center=cls.center,
+            user=User.objects.create_user('teacher', password='pw'),
+        )
+        cls.course = Course.objects.create(
+            course_name='Math', course_teacher=cls.teacher, course_time='10:00',
+            days=['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'], description='', center=cls.center,
+        )
+        cls.students = [
+            Student.objects.create(
+                first_name=f'S{i}', last_name='X', phone_number='9', course=cls.course, gender='MF'[i % 2],
+                center=cls.center, user=User.objects.create_user(f'student-{i}', password='pw'),
+            )
+            for i in range(5)
+        ]
+
+    @classmethod
+    def add_history(cls, days, start=1):
+        # `days` of records for every student, ending `start` days ago, then
+        # the rollup and stats rebuilt from them.
+        today = timezone.localdate()
+        Attendance.objects.bulk_create(
+            Attendance(
+                student=student, course=cls.course, lesson_date=today - timedelta(days=day),
+                status=(day + i) % 3 != 0, center=cls.center, user=cls.teacher.user, marked_by=cls.teacher.user,
+            )
+            for day in range(start, start + days) for i, student in enumerate(cls.students)
+        )
+        rollup.rebuild()
+        student_stats.rebuild()
+
+    def mark(self, user=None):
+        self.client.force_login(user or self.center)
+        statuses = {f'status-{s.pk}': 'present' if i % 2 else 'absent' for i, s in enumerate(self.students)}
+        return self.client.post(reverse('selected-course', args=[self.course.pk]), statuses)
+
+
+def rollups():
+    return sorted(DailyAttendance.objects.values_list('course_id', 'date', 'present', 'absent', 'total'))
+
+
+def stats():
+    fields = ('student_id', 'total', 'present', 'absent', 'rate', 'streak', 'recent', 'last_lesson_date')
+    return sorted(StudentStats.objects.values_list(*fields))
+
+
+class RollupTests(CenterTestCase):
+    def assertRollupCurrent(self):
+        current = rollups()
+        rollup.rebuild()
+        self.assertEqual(current, rollups())
+
+    def test_student_delete(self):
+        self.mark()
+        self.students[1].delete()
+        self.assertRollupCurrent()
+
+    def test_admin_edit_and_delete(self):
+        self.mark()
+        request = RequestFactory().post('/')
+        request.user = self.center
+        admin = site._registry[Attendance]
+        attendance = Attendance.objects.first()
+        attendance.status = not attendance.status
+        admin.save_model(request, attendance, None, True)
+        admin.delete_model(request, Attendance.objects.last())
+        self.assertRollupCurrent()
+
+
+class MarkingTests(CenterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.add_history(5)
+
+    def assertMarked(self, flipped):
+        today = timezone.localdate()
+        marks = sorted(Attendance.objects.filter(lesson_date=today).values_list('student_id', 'status'))
+        self.assertEqual(marks, [(s.pk, bool(i % 2) != flipped) for i, s in enumerate(self.students)])
+        current = rollups(), stats()
+        rollup.rebuild()
+        student_stats.rebuild()
+        self.assertEqual(current, (rollups(), stats()))
+
+    def flip(self):
+        statuses = {f'status-{s.pk}': 'absent' if i % 2 else 'present' for i, s in enumerate(self.students)}
+        return self.client.post(reverse('selected-course', args=[self.course.pk]), statuses)
+
+    def test_resubmit_and_flip(self):
+        self.mark()
+        self.mark()
+        self.assertMarked(flipped=False)
+        self.flip()
+        self.assertMarked(flipped=True)
+
+    def test_concurrent_first_submission(self):
+        # The other request's rows land between our read and our insert.
+        self.mark()
+        marked = views._existing_marks(self.course, timezone.localdate())
+        with mock.patch.object(views, '_existing_marks', side_effect=[{}, marked]):
+            self.assertRedirects(self.flip(), reverse('select-course'), fetch_redirect_response=False)
+        self.assertMarked(flipped=True)
+
+
+class TodayCoursesTests(CenterTestCase):
+    def courses(self, user):
+        self.client.force_login(user)
+        response = self.client.get(reverse('select-course'))
+        return [(item['course'].pk, item['status']) for item in response.context['courses']]
+
+    def test_cache_follows_marks_and_course_edits(self):
+        today = timezone.localdate()
+        with mock.patch.object(schedule, 'courses_for_day', wraps=schedule.courses_for_day) as computed:
+            for user in (self.center, self.teacher.user):
+                self.assertEqual(self.courses(user), [(self.course.pk, False)])
+                self.assertEqual(self.courses(user), [(self.course.pk, False)])
+            self.assertEqual(computed.call_count, 2)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.mark(self.teacher.user)
+            for user in (self.center, self.teacher.user):
+                self.assertEqual(self.courses(user), [(self.course.pk, True)])
+            self.assertEqual(computed.call_count, 4)
+
+        self.client.force_login(self.center)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('edit-course', args=[self.course.pk]), {
+                'name': 'Math', 'teacher': self.teacher.pk, 'time': '10:00', 'description': '',
+                'days': [day for day in self.course.days if day != WEEKDAYS[today.weekday()]],
+            })
+        for user in (self.center, self.teacher.user):
+            self.assertEqual(self.courses(user), [])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CachingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.computed = []
+
+    def get(self, center_id, name='page'):
+        def compute():
+            self.computed.append((center_id, name))
+            return len(self.computed)
+        return caching.get_or_compute(center_id, name, compute)
+
+    def test_miss_then_hit(self):
+        self.assertEqual((self.get(1), self.get(1)), (1, 1))
+        self.assertEqual(self.computed, [(1, 'page')])
+
+    def test_bump_recomputes_after_commit(self):
+        self.get(1)
+        with self.captureOnCommitCallbacks() as callbacks:
+            caching.bump(1)
+        self.assertEqual(self.get(1), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.get(1), 2)
+
+    def test_bump_leaves_other_centers_alone(self):
+        self.get(1)
+        self.get(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            caching.bump(1)
+        self.assertEqual((self.get(1), self.get(2)), (3, 2))
+
+    def test_stats(self):
+        self.assertEqual(caching.stats(), {"hits": 0, "misses": 0, "hit_rate": 0})
+        self.get(1)
+        self.get(1)
+        self.get(1)
+        self.get(2)
+        self.assertEqual(caching.stats(), {"hits": 2, "misses": 2, "hit_rate": 50.0})
+        caching.reset_stats()
+        self.assertEqual(caching.stats()["hit_rate"], 0)
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'entries'},
+        'counters': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'counters'},
+    })
+    def test_counters_survive_culling(self):
+        caching.reset_stats()
+        self.get(1)
+        self.get(1)
+        cache.clear()
+        self.get(1)
+        self.assertEqual(caching.stats(), {"hits": 1, "misses": 2, "hit_rate": 1 / 3 * 100})
+
+
+class QueryBudgetTests(CenterTestCase):
+    # Every dashboard number costs a fixed number of queries, however much
+    # history the center has.
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.add_history(60)
+
+    def test_analytics(self):
+        for scope in (analytics.Scope(center=self.center), analytics.Scope(teacher=self.teacher.user)):
+            with self.assertNumQueries(1):
+                analytics.overview(scope)
+            with self.assertNumQueries(1):
+                analytics.today_summary(scope)
+            with self.assertNumQueries(1):
+                analytics.attendance_rate(scope)
+            with self.assertNumQueries(1):
+                analytics.trend(scope)
+            with self.assertNumQueries(1):
+                analytics.gender_breakdown(scope)
+            with self.assertNumQueries(2):
+                analytics.ranked_students(scope)
+            with self.assertNumQueries(1):
+                analytics.most_regular_students(scope)
+            with self.assertNumQueries(1):
+                analytics.recent_records(scope)
+
+    def test_dashboard_widgets(self):
+        # Session and user, then the widget's own queries; the role comes
+        # from the session once the first request has resolved it.
+        budgets = {
+            'summary': 4, 'trend': 1, 'gender': 1, 'ranked-students': 2, 'regular-students': 1, 'recent': 1,
+        }
+        self.client.force_login(self.center)
+        self.client.get(reverse('dashboard'))
+        for name, budget in budgets.items():
+            with self.subTest(widget=name), self.assertNumQueries(2 + budget):
+                response = self.client.get(reverse('dashboard-widget', args=[name]))
+            self.assertEqual(response.status_code, 200)
+
+
+class ForecastTests(CenterTestCase):
+    def test_weeks_across_the_iso_year_boundary(self):
+        # 2024-12-30 and 2024-12-31 already belong to ISO week 2025-W01.
+        days = [date(2024, 12, 27), date(2024, 12, 30), date(2024, 12, 31), date(2025, 1, 2), date(2025, 1, 6)]
+        weeks, rates = utilities.weekly_rates(days, [1, 1, 0, 1, 2], [2, 1, 1, 2, 2])
+        self.assertEqual(weeks.tolist(), [202452, 202501, 202502])
+        self.assertEqual(rates.tolist(), [50.0, 50.0, 100.0])
+        weeks, _ = utilities.weekly_rates([date(2021, 1, 3), date(2021, 1, 4)], [1, 1], [1, 1])
+        self.assertEqual(weeks.tolist(), [202053, 202101])
+
+    def test_new_mark_invalidates_the_forecast(self):
+        self.add_history(30)
+        with mock.patch.object(utilities, 'weekly_rates', wraps=utilities.weekly_rates) as computed:
+            first = utilities.predicted_attendance(self.center)
+            with self.assertNumQueries(1):
+                self.assertEqual(utilities.predicted_attendance(self.center), first)
+            self.assertEqual(computed.call_count, 1)
+            # A new day's row, then a corrected mark on an existing one.
+            self.mark()
+            utilities.predicted_attendance(self.center)
+            self.assertEqual(computed.call_count, 2)
+            statuses = {f'status-{s.pk}': 'present' for s in self.students}
+            self.client.post(reverse('selected-course', args=[self.course.pk]), statuses)
+            utilities.predicted_attendance(self.center)
+            self.assertEqual(computed.call_count, 3)
+
+
+class InsightJobTests(CenterTestCase):
+    def test_stuck_job_is_requeued(self):
+        job = InsightJob.objects.create(center=self.center)
+        self.assertEqual(jobs.claim_next(), job)
+        self.assertEqual(jobs.enqueue_insight(self.center), job)
+        InsightJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.claim_next(), job)
+        self.assertEqual(InsightJob.objects.count(), 1)
+
+    def test_failed_job_backs_off(self):
+        jobs.enqueue_insight(self.center)
+        jobs.run_job(jobs.claim_next(), lambda center: 1 / 0)
+        for _ in range(3):
+            self.assertEqual(jobs.enqueue_insight(self.center).status, InsightJob.FAILED)
+        self.assertEqual(InsightJob.objects.count(), 1)
+        InsightJob.objects.update(finished_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.enqueue_insight(self.center).status, InsightJob.PENDING)
+
+
+class InsightEscapingTests(CenterTestCase):
+    NAME = '<script>alert(1)</script>`${alert(2)}`'
+
+    def test_local_report_escapes_names(self):
+        facts = {'low_students': [self.NAME], 'predicted_rate': 80, 'last_week_rate': 80, 'overall_rate': 80, 'records': 1}
+        report = ai.LocalBackend().generate('', facts)
+        self.assertNotIn('<script>', report)
+        self.assertIn('&lt;script&gt;', report)
+
+    def test_dashboard_embeds_insight_as_json(self):
+        Insight.objects.create(center=self.center, text=self.NAME, generated_at=timezone.now())
+        self.client.force_login(self.center)
+        response = self.client.get(reverse('dashboard'))
+        self.assertNotContains(response, self.NAME)
+        self.assertContains(response, '<script id="cached-insight" type="application/json">')
+
+
+class TrendRangeTests(CenterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.add_history(10)
+
+    def test_range_dashboard_passes_both_bounds(self):
+        today = timezone.localdate()
+        a, b = today - timedelta(days=5), today - timedelta(days=2)
+        self.client.force_login(self.center)
+        page = self.client.get(reverse('dashboard', args=[a.isoformat(), b.isoformat()])).content.decode()
+        url = reverse('dashboard-widget', args=['trend'])
+        # The query as the script sees it, string escapes and all.
+        query = json.loads(re.search(re.escape(url) + r'", ("[^"]*")', page).group(1))
+        data = self.client.get(f"{url}?{query}").json()
+        self.assertEqual(data['labels'], [str(a + timedelta(days=n)) for n in range(4)])
+
+
+@skipUnless(connection.vendor == 'sqlite', "Index choice is checked against SQLite's planner.")
+class IndexUsageTests(CenterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.add_history(30)
+
+    def assertUsesIndex(self, queryset, index):
+        self.assertIn(index, queryset.explain())
+
+    def test_marking(self):
+        today = timezone.localdate()
+        self.assertUsesIndex(Attendance.objects.filter(course=self.course, lesson_date=today), 'attendance_course_date')
+
+    def test_history(self):
+        page = Attendance.objects.filter(center=self.center).order_by('-time', '-id')[:20]
+        self.assertUsesIndex(page, 'attendance_center_time')
+        today = timezone.localdate()
+        month = Attendance.objects.filter(student=self.students[0], lesson_date__range=(today - timedelta(days=30), today))
+        self.assertUsesIndex(month, 'attendance_student_date')
+
+    def test_daily(self):
+        today = timezone.localdate()
+        self.assertUsesIndex(Attendance.objects.filter(center=self.center, lesson_date=today), 'attendance_center_date')
+        days = DailyAttendance.objects.filter(center=self.center, date__range=(today - timedelta(days=30), today))
+        self.assertUsesIndex(days, 'daily_attendance_center_date')
+
+
+class HistoryDataTests(CenterTestCase):
+    def test_bad_paging_parameters(self):
+        self.mark()
+        for query in ('draw=x', 'start=x&draw=2', 'length=-'):
+            with self.subTest(query=query):
+                response = self.client.get(reverse('attendance-history-data') + '?' + query)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['draw'], 0)
+
+    def test_tampered_cursor_reads_the_first_page(self):
+        self.mark()
+        url = reverse('attendance-history-data')
+        first = self.client.get(url).json()['data']
+        for values in (['x', 'y'], ['2024-01-01T00:00:00+00:00', 'y'], [None, 1], [{}, []], {'a': 1}, 'x', [1]):
+            cursor = encode_cursor(values)
+            with self.subTest(cursor=cursor):
+                response = self.client.get(url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['data'], first)
+
+
+class ArchivedHistoryTests(CenterTestCase):
+    # Six days of history, the older three archived. Each day's rows share
+    # one lesson time, so ties across the two tables are broken by id.
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.add_history(6)
+        for day in Attendance.objects.values_list('lesson_date', flat=True).distinct():
+            lesson = timezone.make_aware(datetime(day.year, day.month, day.day, 10))
+            Attendance.objects.filter(lesson_date=day).update(time=lesson)
+        archive.archive_before(timezone.localdate() - timedelta(days=3))
+
+    def expected(self, archived=True):
+        tables = [Attendance, ArchivedAttendance] if archived else [Attendance]
+        rows = [row for model in tables for row in model.objects.values(*HISTORY_COLUMNS)]
+        return sorted(rows, key=lambda row: (row['time'], row['id']), reverse=True)
+
+    def test_pages_merge_both_tables(self):
+        self.assertEqual((Attendance.objects.count(), ArchivedAttendance.objects.count()), (15, 15))
+        for archived in (True, False):
+            with self.subTest(archived=archived):
+                sources, _ = filter_history(analytics.Scope(center=self.center), {'archived': '1' if archived else ''})
+                rows, cursor = history_page(sources, size=4)
+                while cursor:
+                    page, cursor = history_page(sources, cursor=cursor, size=4)
+                    rows += page
+                self.assertEqual(rows, self.expected(archived))
+                self.assertEqual(history_page(sources, start=8, size=4)[0], self.expected(archived)[8:12])
+
+    def test_history_data(self):
+        self.client.force_login(self.center)
+        url = reverse('attendance-history-data')
+        expected = [serialize_row(row) for row in self.expected()]
+        response = self.client.get(url, {'archived': '1', 'length': 10}).json()
+        rows = response['data']
+        while response['next_cursor']:
+            response = self.client.get(url, {'archived': '1', 'length': 10, 'cursor': response['next_cursor']}).json()
+            rows += response['data']
+        self.assertEqual(rows, expected)
+        self.assertEqual(response['recordsTotal'], 30)
+        self.assertEqual(self.client.get(url).json()['recordsTotal'], 15)
+
+    def test_history_and_export(self):
+        self.client.force_login(self.center)
+        for params, total in (({'archived': '1'}, 30), ({}, 15)):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('attendance-history'), params)
+                self.assertEqual(response.context['total'], total)
+                expected = [serialize_row(row) for row in self.expected(bool(params))[:25]]
+                self.assertEqual(response.context['attendances'], expected)
+                response = self.client.get(reverse('attendance-history-csv'), params)
+                self.assertEqual(b''.join(response.streaming_content).count(b'\n'), total + 1)
+
+    def test_archive_admin_is_read_only(self):
+        self.client.force_login(User.objects.create_superuser('root', password='pw'))
+        for model in (ArchivedAttendance, ArchivedAttendanceSummary):
+            pk = model.objects.first().pk
+            with self.subTest(model=model.__name__):
+                name = f'admin:attendance_tracker_{model._meta.model_name}'
+                self.assertNotContains(self.client.get(reverse(f'{name}_change', args=[pk])), 'name="_save"')
+                response = self.client.post(reverse(f'{name}_delete', args=[pk]), {'post': 'yes'})
+                self.assertEqual(response.status_code, 403)
+                self.assertEqual(self.client.get(reverse(f'{name}_add')).status_code, 403)
+        self.assertEqual(ArchivedAttendance.objects.count(), 15)
+
+
+class ExportTests(CenterTestCase):
+    ROWS = 100_000
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        users = User.objects.bulk_create(
+            [User(username=f'export-{i}') for i in range(cls.ROWS)], batch_size=5000,
+        )
+        Student.objects.bulk_create(
+            [
+                Student(first_name=f'F{i}', last_name=f'L{i}', phone_number='9', course=cls.course, gender='M',
+                        center=cls.center, user=user)
+                for i, user in enumerate(users)
+            ],
+            batch_size=5000,
+        )
+        # 200 students over 500 days.
+        today = timezone.localdate()
+        students = list(Student.objects.filter(center=cls.center)[:200])
+        Attendance.objects.bulk_create(
+            [
+                Attendance(student=student, course=cls.course, lesson_date=today - timedelta(days=day),
+                           status=day % 2 == 0, center=cls.center, marked_by=cls.center)
+                for day in range(cls.ROWS // len(students)) for student in students
+            ],
+            batch_size=5000,
+        )
+
+    def consume(self, response):
+        # Peak memory of streaming the whole response, and its line count.
+        lines = 0
+        tracemalloc.start()
+        try:
+            for chunk in response.streaming_content:
+                lines += chunk.count(b'\n')
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return peak, lines
+
+    def test_attendance(self):
+        with self.assertNumQueries(1):
+            peak, lines = self.consume(export_attendance([Attendance.objects.filter(center=self.center)]))
+        self.assertEqual(lines, self.ROWS + 1)
+        self.assertLess(peak, 5 * 1024 * 1024)
+
+    def test_students(self):
+        with self.assertNumQueries(1):
+            peak, lines = self.consume(export_students(Student.objects.filter(center=self.center)))
+        self.assertEqual(lines, self.ROWS + len(self.students) + 1)
+        self.assertLess(peak, 5 * 1024 * 1024)
+
+
+class PromptTests(CenterTestCase):
+    FORECAST = [80.0, 78.0]
+
+    def test_size_does_not_grow_with_history(self):
+        budget = len(prompts.HEADER) + len(prompts.FOOTER) + 300
+        self.add_history(10)
+        with self.assertNumQueries(1):
+            short, _ = prompts.build_prompt(self.center, self.FORECAST, budget=budget)
+        self.add_history(300, start=11)
+        long, facts = prompts.build_prompt(self.center, self.FORECAST, budget=budget)
+        self.assertEqual(facts['records'], 310 * len(self.students))
+        self.assertLessEqual(len(short), budget)
+        self.assertLessEqual(len(long), budget)
+        self.assertEqual(short.count("\n"), long.count("\n"))
+
+    def test_budget_smaller_than_one_line(self):
+        lines = ['x' * 60, 'y' * 60]
+        note = prompts.OMITTED.format(2)
+        self.assertEqual(prompts.fit_lines(lines, 0), [])
+        self.assertEqual(prompts.fit_lines(lines, len(note)), [])
+        self.assertEqual(prompts.fit_lines(lines, len(note) + 1), [note])
+        self.add_history(3)
+        # With nothing to fit, the prompt is just the header and the footer.
+        base = len(prompts.build_prompt(self.center, self.FORECAST, budget=0)[0])
+        note = prompts.OMITTED.format(len(self.students))
+        for extra in (0, 10, len(note) + 1):
+            with self.subTest(extra=extra):
+                prompt, _ = prompts.build_prompt(self.center, self.FORECAST, budget=base + extra)
+                self.assertLessEqual(len(prompt), base + extra)
+                self.assertEqual(note in prompt, extra > len(note))
+
+    def test_rates_include_the_archive(self):
+        self.add_history(30)
+        archive.archive_before(timezone.localdate() - timedelta(days=10))
+        summaries = prompts.student_summaries(self.center)
+        stats = {row.student_id: row for row in StudentStats.objects.all()}
+        self.assertEqual(len(summaries), len(self.students))
+        for summary in summaries:
+            self.assertEqual(summary['total'], 30)
+            self.assertEqual(summary['rate'], stats[summary['id']].rate)
+
+
+class SyncTests(CenterTestCase):
+    def entry(self, key, student=0, status='present', days_ago=0):
+        day = timezone.localdate() - timedelta(days=days_ago)
+        return {'key': key, 'course': self.course.pk, 'student': self.students[student].pk,
+                'date': day.isoformat(), 'status': status}
+
+    def results(self, entries):
+        results = sync.apply_marks(self.center, 'admin', self.center, entries)
+        return [result.get('error', result['result']) for result in results]
+
+    def test_duplicate_key_is_not_replayed(self):
+        batch = [self.entry('k1'), self.entry('k1', student=1)]
+        self.assertEqual(self.results(batch), ['created', 'Duplicate key in this batch.'])
+        self.assertEqual(self.results(batch), ['created', 'Duplicate key in this batch.'])
+        self.assertFalse(Attendance.objects.filter(student=self.students[1]).exists())
+
+    def test_key_reused_for_another_mark(self):
+        self.results([self.entry('k1')])
+        self.assertEqual(self.results([self.entry('k1', status='absent')]), ['Key was already used for a different mark.'])
+        self.assertTrue(Attendance.objects.get().status)
+
+    def test_archived_dates_are_rejected(self):
+        with self.settings(ATTENDANCE_HOT_DAYS=10):
+            results = self.results([self.entry('old', days_ago=11), self.entry('new', days_ago=10)])
+        self.assertTrue(results[0].startswith('date is before'))
+        self.assertEqual(results[1], 'created')
+
+    def test_old_keys_are_pruned(self):
+        self.results([self.entry('k1')])
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=31))
+        self.assertEqual(sync.prune_keys(), 1)
+
+    def post(self, user, body):
+        self.client.force_login(user)
+        if not isinstance(body, (str, bytes)):
+            body = json.dumps(body)
+        return self.client.post(reverse('attendance-sync'), body, content_type='application/json')
+
+    def test_bad_requests(self):
+        self.assertEqual(self.post(self.students[0].user, {'marks': []}).status_code, 403)
+        for body in ('not json', [], {'marks': {}}, {}):
+            with self.subTest(body=body):
+                self.assertEqual(self.post(self.teacher.user, body).status_code, 400)
+        with mock.patch.object(sync, 'MAX_MARKS', 2):
+            response = self.post(self.teacher.user, {'marks': [self.entry(f'k{i}', student=i) for i in range(3)]})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_other_teachers_students_are_rejected(self):
+        other = Teacher.objects.create(
+            first_name='T', last_name='Two', phone_number='2', center=self.center,
+            user=User.objects.create_user('teacher-2', password='pw'),
+        )
+        response = self.post(other.user, {'marks': [self.entry('k1')]})
+        self.assertEqual(response.json()['results'], [
+            {'key': 'k1', 'result': 'error', 'error': 'Student is not in one of your courses.'},
+        ])
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_updates_keep_rollup_and_stats_current(self):
+        self.add_history(3)
+        first = [self.entry(f'a{i}', student=i) for i in range(3)]
+        second = [self.entry('b0', student=0, status='absent'), self.entry('b1', student=1),
+                  self.entry('b2', status='absent', days_ago=1)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post(self.teacher.user, {'marks': first})
+            response = self.post(self.teacher.user, {'marks': second})
+        self.assertEqual([r['result'] for r in response.json()['results']], ['updated', 'unchanged', 'updated'])
+        self.assertFalse(Attendance.objects.get(student=self.students[0], lesson_date=timezone.localdate()).status)
+        current = rollups(), stats()
+        rollup.rebuild()
+        student_stats.rebuild()
+        self.assertEqual(current, (rollups(), stats()))
+
+    def test_concurrent_upload_is_retried(self):
+        # The other upload's row lands between our read and our insert.
+        self.results([self.entry('k1', status='absent')])
+        lookups = iter([lambda marks: {}, sync._existing_marks])
+        with mock.patch.object(sync, '_existing_marks', side_effect=lambda marks: next(lookups)(marks)):
+            self.assertEqual(self.results([self.entry('k2')]), ['updated'])
+        self.assertTrue(Attendance.objects.get().status)
+        self.assertEqual(sorted(IdempotencyKey.objects.values_list('key', flat=True)), ['k1', 'k2'])
+
+
+class SyntheticTests(TestCase):
+    def test_rows_carry_their_lesson_time(self):
+        synthetic.generate(teachers=1, students=4, days=14, courses_per_teacher=1, batch_size=5)
+        tz = timezone.get_current_timezone()
+        for lesson_date, course_time, time in Attendance.objects.values_list('lesson_date', 'course__course_time', 'time'):
+            self.assertEqual(timezone.localtime(time, tz).replace(tzinfo=None), datetime.combine(lesson_date, course_time))
+        # The model itself is left alone.
+        self.assertTrue(Attendance._meta.get_field('time').auto_now_add)
+        attendance = Attendance.objects.create(
+            student=Student.objects.first(), course=Course.objects.first(), status=True, center=User.objects.first(),
+        )
+        self.assertGreater(attendance.time, timezone.now() - timedelta(minutes=1))
+
+
+class AsyncDashboardURLs:
+    # config.urls as under ASYNC_DASHBOARDS, which it reads once at import.
+    urlpatterns = [
+        path('widgets/<slug:name>/', views.dashboard_widget_async, name='dashboard-widget'),
+        *urls.urlpatterns,
+    ]
+
+
+@override_settings(REQUEST_TIMING=True)
+class RequestTimingTests(CenterTestCase):
+    def server_timing(self, response):
+        return dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+
+    def test_streamed_queries_are_logged(self):
+        self.client.force_login(self.center)
+        with self.assertLogs('attendance_tracker.timing') as logs:
+            response = self.client.get(reverse('student-list-csv'))
+            header = self.server_timing(response)
+            before = int(re.match(r'desc="(\d+) before the body"', header['queries']).group(1))
+            self.assertEqual(logs.output, [])
+            b''.join(response.streaming_content)
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertTrue(line['streamed'])
+        self.assertGreater(line['queries'], before)
+
+    @override_settings(ROOT_URLCONF=AsyncDashboardURLs)
+    async def test_async_widgets_are_timed(self):
+        async def get_response(request):
+            pass
+
+        self.assertTrue(iscoroutinefunction(RequestTimingMiddleware(get_response)))
+        await self.async_client.aforce_login(self.center)
+        # `summary` queries through the async ORM, `trend` in a sync builder.
+        for name in ('summary', 'trend'):
+            with self.subTest(widget=name), self.assertLogs('attendance_tracker.timing') as logs:
+                response = await self.async_client.get(reverse('dashboard-widget', args=[name]))
+                self.assertEqual(response.status_code, 200)
+                queries = int(self.server_timing(response)['queries'].split('"')[1])
+                self.assertGreater(queries, 0)
+                line = json.loads(logs.records[-1].getMessage())
+                self.assertEqual((line['view'], line['queries']), ('dashboard-widget', queries))
+
+    def test_web_requests_report_no_ai_time(self):
+        self.client.force_login(self.center)
+        with self.assertLogs('attendance_tracker.timing') as logs:
+            response = self.client.get(reverse('dashboard'))
+        self.assertNotIn('ai', self.server_timing(response))
+        self.assertNotIn('ai_ms', json.loads(logs.records[-1].getMessage()))
+
+    def test_insight_worker_is_timed(self):
+        def generate(center):
+            with timing.timed('ai'):
+                return str(Student.objects.count())
+
+        with self.assertLogs('attendance_tracker.timing') as logs:
+            self.assertEqual(run_insight_worker.timed(generate)(self.center), '5')
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((line['job'], line['center'], line['queries']), ('insight', self.center.pk, 1))
+        self.assertIn('ai_ms', line)
+
+
+class StudentStatsBackfillTests(CenterTestCase):
+    def test_matches_rebuild(self):
+        self.add_history(40)
+        archive.archive_before(timezone.localdate() - timedelta(days=15))
+        rebuilt = stats()
+        StudentStats.objects.all().delete()
+        migration = importlib.import_module('attendance_tracker.migrations.0009_studentstats')
+        with mock.patch.object(migration, 'BATCH_SIZE', 2):
+            migration.backfill_student_stats(apps, None)
+        self.assertEqual(stats(), rebuilt)
+
+
+def use_replica(settings_dict):
+    # Point the `replica` alias at `settings_dict`, or drop it for None.
+    if routers.REPLICA in connections.databases:
+        connections[routers.REPLICA].close()
+        del connections[routers.REPLICA]
+        del connections.databases[routers.REPLICA]
+    if settings_dict is not None:
+        connections.databases[routers.REPLICA] = settings_dict
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    DATABASE_ROUTERS=['config.routers.ReplicaRouter'],
+    REPLICA_PIN_SECONDS=60,
+)
+class ReplicaTests(TransactionTestCase):
+    """default in memory and the replica in a second SQLite file, kept fresh by sync_replica."""
+
+    @classmethod
+    def setUpClass(cls):
+        fd, cls.replica_name = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        # Under REPLICA_DATABASE the alias already mirrors default; keep that to restore.
+        cls.mirror = connections[routers.REPLICA].settings_dict if routers.REPLICA in connections.databases else None
+        use_replica({**connections['default'].settings_dict, 'NAME': cls.replica_name})
+        # Declared here, not on the class: the test runner would otherwise try
+        # to set up a replica that may not be configured.
+        cls.databases = {'default', routers.REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        use_replica(cls.mirror)
+        os.remove(cls.replica_name)
+
+    def setUp(self):
+        self.center = User.objects.create_user('center')
+        self.teacher = Teacher.objects.create(
+            first_name='T', last_name='One', phone_number='1', center=self.center,
+            user=User.objects.create_user('teacher'),
+        )
+        self.course = Course.objects.create(
+            course_name='Math', course_teacher=self.teacher, course_time='10:00',
+            days=['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'], description='', center=self.center,
+        )
+        self.add_student('Early')
+        self.sync()
+        self.add_student('Late')
+        self.client.force_login(self.center)
+
+    def add_student(self, name):
+        return Student.objects.create(
+            first_name=name, last_name='X', phone_number='9', course=self.course, gender='M',
+            center=self.center, user=User.objects.create_user(name),
+        )
+
+    def sync(self):
+        call_command('sync_replica', once=True, stdout=io.StringIO())
+
+    def listed(self):
+        return sorted(s.first_name for s in self.client.get(reverse('student-list')).context['students'])
+
+    def test_reads_go_to_the_replica(self):
+        self.assertTrue(routers.has_replica())
+        self.assertEqual(self.listed(), ['Early'])
+        self.assertEqual(Student.objects.count(), 2)
+
+    def test_writes_go_to_default_and_pin_reads_to_it(self):
+        student = Student.objects.get(first_name='Early')
+        self.client.post(reverse('selected-course', args=[self.course.pk]), {f'status-{student.pk}': 'present'})
+        self.assertEqual(Attendance.objects.using('default').count(), 1)
+        self.assertEqual(Attendance.objects.using(routers.REPLICA).count(), 0)
+        self.assertEqual(self.listed(), ['Early', 'Late'])
+
+        later = time.time() + 61
+        with mock.patch.object(routers, 'time', mock.Mock(time=lambda: later)):
+            self.assertEqual(self.listed(), ['Early'])
+
+    def test_sync_copies_only_after_default_changed(self):
+        class Stop(Exception):
+            pass
+
+        def add(name):
+            try:
+                self.add_student(name)
+            finally:
+                connections.close_all()
+
+        def add_elsewhere():
+            # sync_replica only notices commits from other connections, as
+            # from the web server in production.
+            thread = threading.Thread(target=add, args=['Later'])
+            thread.start()
+            thread.join()
+
+        def sleep(seconds):
+            actions.pop(0)()
+
+        actions = [lambda: None, add_elsewhere, mock.Mock(side_effect=Stop)]
+        copy = sync_replica.Command.copy
+        with mock.patch.object(sync_replica.time, 'sleep', sleep), \
+                mock.patch.object(sync_replica.Command, 'copy', autospec=True, side_effect=copy) as copied:
+            with self.assertRaises(Stop):
+                call_command('sync_replica', interval=0, stdout=io.StringIO())
+        # Copied on the first pass and after the write, not in between.
+        self.assertEqual(copied.call_count, 2)
+        self.assertEqual(self.listed(), ['Early', 'Late', 'Later'])
@@ -0,0 +1,120 @@
+import contextvars
+import json
+import logging
+import time
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+slow_query_logger = logging.getLogger('attendance_tracker.slow_queries')
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class Timings:
+    """Durations (ms) and the DB query count collected while serving one request or job.
+
+    `names` are reported even when nothing was recorded under them.
+    """
+
+    def __init__(self, names=('db', 'view', 'template')):
+        self.durations = dict.fromkeys(names, 0.0)
+        self.queries = 0
+        self.view_name = None
+        self.view_started = None
+
+    def add(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds * 1000
+
+
+def current():
+    return _current.get()
+
+
+def activate(timings):
+    return _current.set(timings)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+@contextmanager
+def track_queries(timings):
+    """Count and time every query run on any connection inside the block."""
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(QueryTimer(timings, alias)))
+        yield
+
+
+@asynccontextmanager
+async def atrack_queries(timings):
+    """track_queries for async code.
+
+    Connections belong to a thread, and async code queries from the
+    thread sync_to_async runs it in, so the wrappers are put on there.
+    """
+    stack = ExitStack()
+    await sync_to_async(stack.enter_context)(track_queries(timings))
+    try:
+        yield
+    finally:
+        await sync_to_async(stack.close)()
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to `name` for the current request, if one is being timed."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+class QueryTimer:
+    def __init__(self, timings, alias):
+        self.timings = timings
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings.queries += 1
+            self.timings.add('db', elapsed)
+            if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+                slow_query_logger.warning(json.dumps({
+                    "view": self.timings.view_name,
+                    "database": self.alias,
+                    "ms": round(elapsed * 1000, 1),
+                    "sql": sql,
+                    "params": [str(param) for param in params] if params and not many else None,
+                }))
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    # DjangoTemplates with render time reported to the request timing middleware.
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
@@ -5,5 +5,8 @@ from .views import *
 urlpatterns = [
     path('', select_course, name='select-course'),
     path('selected-course/<int:id>/', marking, name='selected-course'),
+    path('sync/', sync_marks, name='attendance-sync'),
     path('history/', history, name='attendance-history'),
+    path('history/data/', history_data, name='attendance-history-data'),
+    path('history/download-csv/', history, name='attendance-history-csv'),
 ]
\ No newline at end of file
@@ -1,289 +1,328 @@
+import hashlib
 import json
+from functools import wraps
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Q, ExpressionWrapper, F, FloatField
-from django.db.models.functions import TruncDate, NullIf
-from django.contrib import messages
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse
+from django.db import IntegrityError, transaction
 from django.shortcuts import render, redirect
-from datetime import date, timedelta, datetime
-
-from attendance_tracker.models import Attendance
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import urlencode
+
+from accounts.decorators import role_required
+from attendance_tracker import caching, jobs, rollup, schedule, student_stats, sync, widgets
+from attendance_tracker.analytics import with_stats
+from attendance_tracker.exports import export_attendance
+from attendance_tracker.history import (
+    PAGE_SIZE, filter_history, history_count, history_page, history_scope, serialize_row,
+)
+from attendance_tracker.models import Attendance, Insight
+from config.routers import replica_reads
 from courses.models import Course
 from students.models import Student
-from teachers.models import Teacher
-
-from attendance_tracker.utilities import insights
 
 def index(request):
     return render(request, 'index.html')
 
-def attendance_annotate(qs):
-    return qs.annotate(
-        total=Count('attendance'),
-        present=Count('attendance', filter=Q(attendance__status=True)),
-    ).annotate(
-        attendance_rate=ExpressionWrapper(
-            100.0 * F('present') / NullIf(F('total'), 0),
-            output_field=FloatField()
-        )
-    )
+def _trend_query(a=None, b=None, c=None):
+    if c:
+        return urlencode({'days': c})
+    if a and b:
+        return urlencode({'a': a, 'b': b})
+    return ""
+
+def _dashboard_context(a, b, c, insight, insight_stale):
+    return {
+        "role": "admin",
+        "trend_query": _trend_query(a, b, c),
+        "predicted_attendance_rate": insight.text if insight else "",
+        "insight_stale": insight_stale,
+    }
 
 def dashboard(request, a=None, b=None, c=None):
+    # Only the shell is rendered here; every widget loads from dashboard_widget.
     if request.user.is_authenticated:
-        if hasattr(request.user, 'teacher_user'):
+        if request.role == 'teacher':
             return redirect('teacher-dashboard')
-        elif hasattr(request.user, 'student_user'):
+        elif request.role == 'student':
             return redirect('student-dashboard')
-        predicted_attendance_rate = insights(request)
-        students = Student.objects.annotate(
-            total=Count('attendance'),
-            total_lessons=Count('attendance'),
-            absent=Count('attendance', filter=Q(attendance__status=False)),
-            present=Count('attendance', filter=Q(attendance__status=True))
-        ).filter(
-            total__gt=0, center=request.user
-            # absent__lt=2
-        ).order_by('absent', '-present')[:5]
-
-        students_low_attendance = attendance_annotate(Student.objects.filter(center=request.user)).order_by('attendance_rate')[:10]
-        top_student = attendance_annotate(Student.objects.filter(center=request.user)).order_by('-attendance_rate')[:10]
-
-
-        gender_counts = Student.objects.filter(center=request.user).values('gender').annotate(count=Count('id'))
-
-        gender_data = {
-            "labels": [("Male" if g["gender"] == "M" else "Female") for g in gender_counts],
-            "values": [g["count"] for g in gender_counts]
-        }
-
-        absent_students = Student.objects.annotate(
-            absents_today=Count('attendance', filter=Q(
-                attendance__status=False,
-                attendance__time__date=date.today()
-            ))
-        ).filter(
-            absents_today__gt=0, center=request.user
-        )
-
-        present_student = Student.objects.annotate(
-            absents_today=Count('attendance', filter=Q(
-                attendance__status=True,
-                attendance__time__date=date.today()
-            ))
-        ).filter(
-            absents_today__gt=0, center=request.user
-        )
-
-        attendance_trends = (
-            Attendance.objects
-            .filter(center=request.user)
-            .annotate(date=TruncDate('time'))
-            .values('date')
-            .annotate(count=Count('id'))
-            .order_by('date')
-        )
-        if a and b:
-            attendance_trends = attendance_trends.filter(date__range=(a, b))
-        elif c:
-            a = date.today() - timedelta(days=c)
-            b = date.today()
-            attendance_trends = attendance_trends.filter(date__range=(a, b))
-        dates = [record["date"].strftime("%Y-%m-%d") for record in attendance_trends]
-        counts = [record["count"] for record in attendance_trends]
-
-        todays_courses = 0
-        today = date.today().strftime("%a")
-        for i in Course.objects.filter(center=request.user):
-            if today in i.days:
-                todays_courses += 1
-        line_chart_data = {
-            "labels": dates,
-            "values": counts
-        }
-
-        attendance_rate = (
-            Attendance.objects.filter(status=True, center=request.user).count() /
-            Attendance.objects.filter(center=request.user).count()
-            ) * 100 if Attendance.objects.filter(center=request.user).exists() else 0
-
-        present_today = Attendance.objects.filter(status=True, time__date=date.today(), center=request.user).count()
-        total_today = Attendance.objects.filter(time__date=date.today(), center=request.user).count()
-
-        attendance_rate_today = (
-            (present_today / total_today) * 100
-            if total_today > 0 else 0
-        )
-        role = "admin"
-        if hasattr(request.user, 'teacher_user'):
-            role = "teacher"
-        # predicted_attendance_rate = insights(request)
-        # predicted_attendance_rate = json.loads(predicted_attendance_rate.content)
-        print("==========================")
-        # print(predicted_attendance_rate)
-        print("==========================")
-        data = {
-            "students": Student.objects.filter(center=request.user),
-            "top_students": top_student,
-            "students_low_attendance": students_low_attendance,
-            "teachers": Teacher.objects.filter(center=request.user),
-            "courses": Course.objects.filter(center=request.user),
-            "absent_students": absent_students,
-            "lessons": Attendance.objects.filter(center=request.user),
-            "gender_data": gender_data,
-            "line_chart_data":line_chart_data,
-            "attendance_rate": attendance_rate,
-            "attendance_rate_today": attendance_rate_today,
-            "today_courses": todays_courses,
-            "present_student": present_student,
-            "date": date.today(),
-            "attendance_records": Attendance.objects.filter(center=request.user).order_by('-time')[:10],
-            "role": role,
-            "predicted_attendance_rate":predicted_attendance_rate,
-        }
-        return render(request, 'dashboard.html', data)
+        insight = Insight.objects.filter(center=request.user).first()
+        insight_stale = jobs.is_stale(insight)
+        if insight_stale:
+            jobs.enqueue_insight(request.user)
+        return render(request, 'dashboard.html', _dashboard_context(a, b, c, insight, insight_stale))
     else:
         return index(request)
 
+async def dashboard_async(request, a=None, b=None, c=None):
+    """dashboard for ASGI servers (ASYNC_DASHBOARDS)."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return await sync_to_async(index)(request)
+    if request.role == 'teacher':
+        return redirect('teacher-dashboard')
+    if request.role == 'student':
+        return redirect('student-dashboard')
+    insight = await Insight.objects.filter(center=user).afirst()
+    insight_stale = jobs.is_stale(insight)
+    if insight_stale:
+        await sync_to_async(jobs.enqueue_insight)(user)
+    return await sync_to_async(render)(request, 'dashboard.html', _dashboard_context(a, b, c, insight, insight_stale))
+
+
+def _widget_state(request, name):
+    # Shared by the ETag, Last-Modified and payload of one widget request.
+    if not hasattr(request, '_widget_state'):
+        state = None
+        owner = widgets.widget_scope(request) if name in widgets.WIDGETS else None
+        if owner is not None:
+            scope, center_id = owner
+            key = f"widget:{name}:{request.user.pk}:{request.GET.urlencode()}:{timezone.localdate()}"
+            state = (scope, center_id, caching.version(center_id), key)
+        request._widget_state = state
+    return request._widget_state
+
+
+def widget_etag(request, name):
+    state = _widget_state(request, name)
+    if state is not None:
+        _, center_id, version, key = state
+        return hashlib.md5(f"{center_id}:{version}:{key}".encode(), usedforsecurity=False).hexdigest()
+
+
+def widget_last_modified(request, name):
+    state = _widget_state(request, name)
+    if state is not None:
+        return datetime.fromtimestamp(state[2] / 1e9, tz=dt_timezone.utc)
+
+
+@login_required
+@replica_reads
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=widget_etag, last_modified_func=widget_last_modified)
+def dashboard_widget(request, name):
+    """One dashboard widget as JSON; 304 until the center's data version changes."""
+    if name not in widgets.WIDGETS:
+        raise Http404
+    state = _widget_state(request, name)
+    if state is None:
+        return JsonResponse({"error": "You do not have a permission."}, status=403)
+    scope, center_id, _, key = state
+    data = caching.get_or_compute(center_id, key, lambda: widgets.WIDGETS[name](scope, request.GET))
+    return JsonResponse(data, safe=False)
+
+
+def load_widget_state(view):
+    # condition() calls widget_etag and widget_last_modified synchronously
+    # even around an async view, so do their queries off the event loop first.
+    @wraps(view)
+    async def wrapper(request, name):
+        await sync_to_async(_widget_state)(request, name)
+        return await view(request, name)
+    return wrapper
+
+
 @login_required
+@replica_reads
+@load_widget_state
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=widget_etag, last_modified_func=widget_last_modified)
+async def dashboard_widget_async(request, name):
+    """dashboard_widget for ASGI servers; its queries run off the event loop, one at a time."""
+    if name not in widgets.WIDGETS:
+        raise Http404
+    state = _widget_state(request, name)
+    if state is None:
+        return JsonResponse({"error": "You do not have a permission."}, status=403)
+    scope, center_id, _, key = state
+    data = await caching.aget_or_compute(center_id, key, lambda: widgets.abuild(name, scope, request.GET))
+    return JsonResponse(data, safe=False)
+
+@login_required
+@role_required('admin', 'teacher')
 def select_course(request):
-    if hasattr(request.user, 'student_user'):
-        messages.error(request, 'You do not have a permission.')
-        return redirect('dashboard')
-    today = date.today()
-    weekday = today.strftime("%a")
-    courses = Course.objects.filter(days__contains=weekday, center=request.user)
-    if hasattr(request.user, 'teacher_user'):
-        courses = Course.objects.filter(days__contains=weekday, course_teacher__user=request.user)
-    marked_courses = []
-    for course in courses:
-        has_attendance = Attendance.objects.filter(course=course, time__date=today, center=request.user).exists()
-        if hasattr(request.user, 'teacher_user'):
-            has_attendance = Attendance.objects.filter(course=course, time__date=today, course__course_teacher__user=request.user).exists()
-        marked_courses.append({
-            "course": course,
-            "status": has_attendance,
-            })
-    role = "admin"
-    if hasattr(request.user, 'teacher_user'):
-        role = "teacher"
+    today = timezone.localdate()
+    if request.role == 'teacher':
+        courses = Course.objects.filter(course_teacher__user=request.user)
+    else:
+        courses = Course.objects.filter(center=request.user)
+    marked_courses = [
+        {"course": course, "status": course.marked}
+        for course in schedule.today_courses(request.center_id, request.user.pk, courses, today)
+    ]
     data = {
         "courses": marked_courses,
-        "role": role,
+        "role": request.role,
     }
     return render(request, "marking-attendance/select_course.html", data)
 
+def _existing_marks(course, day):
+    return {
+        a.student_id: a
+        for a in Attendance.objects.select_for_update().filter(course=course, lesson_date=day)
+    }
+
+def _save_marks(course, day, statuses, center, teacher_user, user):
+    with transaction.atomic():
+        # Submissions for one course queue on its row, and re-submitting the
+        # same course on the same day corrects the existing rows instead of
+        # adding a second set.
+        list(Course.objects.select_for_update().filter(pk=course.pk).values_list('pk'))
+        existing = _existing_marks(course, day)
+        created, updated, marks = [], [], []
+        present = absent = 0
+        for student_id, status in statuses.items():
+            attendance = existing.get(student_id)
+            if attendance is None:
+                created.append(Attendance(student_id=student_id, course=course, lesson_date=day, status=status,
+                                          center=center, user=teacher_user, marked_by=user))
+                marks.append((student_id, day, status, None))
+                present += status
+                absent += not status
+            elif attendance.status != status:
+                marks.append((student_id, day, status, attendance.status))
+                attendance.status = status
+                attendance.marked_by = user
+                updated.append(attendance)
+                present += 1 if status else -1
+                absent += -1 if status else 1
+        Attendance.objects.bulk_create(created)
+        Attendance.objects.bulk_update(updated, ['status', 'marked_by'])
+        if created or updated:
+            rollup.record_marks(center, course, day, present=present, absent=absent)
+            student_stats.record_marks(center, marks)
+            caching.bump(center.pk)
+
 @login_required
+@role_required('admin', 'teacher')
 def marking(request, id):
-    if hasattr(request.user, 'student_user'):
-        messages.error(request, 'You do not have a permission.')
-        return redirect('dashboard')
-    role = "admin"
-    if hasattr(request.user, 'teacher_user'):
-        students = Student.objects.annotate(
-            total=Count('attendance'),
-            present=Count('attendance', filter=Q(attendance__status=True)),
-        ).annotate(
-            attendance_rate=ExpressionWrapper(
-                100.0 * F('present') / NullIf(F('total'), 0),
-                output_field=FloatField()
-            )
-        ).filter(course__id=id, course__course_teacher__user=request.user)
-        attendances = Attendance.objects.filter(course_id=id, time__date=date.today(),
-                                                course__course_teacher__user=request.user)
+    center = request.center
+    if request.role == 'teacher':
         course = Course.objects.get(pk=id, course_teacher__user=request.user)
-        role = "teacher"
+        teacher_user = request.user
     else:
-        students = Student.objects.annotate(
-            total=Count('attendance'),
-            present=Count('attendance', filter=Q(attendance__status=True)),
-        ).annotate(
-            attendance_rate=ExpressionWrapper(
-                100.0 * F('present') / NullIf(F('total'), 0),
-                output_field=FloatField()
-            )
-        ).filter(course__id=id, center=request.user)
-        attendances = Attendance.objects.filter(course_id=id, time__date=date.today(), center=request.user)
-        course = Course.objects.get(pk=id, center=request.user)
+        course = Course.objects.select_related('course_teacher__user').get(pk=id, center=request.user)
+        teacher_user = course.course_teacher.user
+    students = Student.objects.filter(course=course, center_id=request.center_id)
+    today = timezone.localdate()
 
     if request.method == "POST":
-        for i in students:
-            status = request.POST.get(f'status-{i.id}')
-            if status == "present":
-                status = True
-            elif status == "absent":
-                status = False
-            if hasattr(request.user, 'teacher_user'):
-                center = Teacher.objects.get(user=request.user).center
-                Attendance.objects.create(student_id=i.id, course_id=id, status=status, center=center, user=request.user, marked_by=request.user)
-            else:
-                user = Course.objects.get(pk=id, center=request.user).course_teacher.user
-                Attendance.objects.create(student_id=i.id, course_id=id, status=status, center=request.user, user=user, marked_by=request.user)
+        statuses = {}
+        for student_id in students.values_list('id', flat=True):
+            status = request.POST.get(f'status-{student_id}')
+            if status in ("present", "absent"):
+                statuses[student_id] = status == "present"
+
+        for attempt in range(2):
+            try:
+                _save_marks(course, today, statuses, center, teacher_user, request.user)
+                break
+            except IntegrityError:
+                # A concurrent first submission created the rows after we
+                # read; the second pass corrects them instead.
+                if attempt:
+                    raise
         return redirect("select-course")
 
-    if attendances.exists():
-        attendances = attendances
-        marked_by = attendances[0].marked_by
-    else:
-        attendances = None
-        marked_by = None
+    attendances = list(
+        Attendance.objects.filter(course=course, lesson_date=today).select_related('marked_by').order_by('time')
+    )
+    statuses = {a.student_id: a.status for a in attendances}
+    students = list(with_stats(students))
+    for student in students:
+        student.today_status = statuses.get(student.id)
 
     data = {
         "students": students,
         "course": course,
         "attendances": attendances,
-        "date": date.today(),
-        "role": role,
-        "marked_by": marked_by
+        "date": today,
+        "role": request.role,
+        "marked_by": attendances[0].marked_by if attendances else None,
     }
     return render(request, "marking-attendance/marking.html", data)
 
-def history(request):
-    if hasattr(request.user, 'student_user'):
-        messages.error(request, 'You do not have a permission.')
-        return redirect('dashboard')
+@login_required
+@require_POST
+@role_required('admin', 'teacher', json=True)
+def sync_marks(request):
+    """Apply a batch of offline marks (see attendance_tracker.sync) and report each one."""
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "The body must be JSON."}, status=400)
+    marks = payload.get('marks') if isinstance(payload, dict) else None
+    if not isinstance(marks, list):
+        return JsonResponse({"error": "Expected {\"marks\": [...]}."}, status=400)
+    if len(marks) > sync.MAX_MARKS:
+        return JsonResponse({"error": f"At most {sync.MAX_MARKS} marks per request."}, status=400)
+    return JsonResponse({"results": sync.apply_marks(request.user, request.role, request.center, marks)})
 
-    attendances = Attendance.objects.filter(center=request.user).order_by('-time')
+@login_required
+@role_required('admin', 'teacher')
+@replica_reads
+def history(request):
+    scope = history_scope(request.role, request.user)
+    params = request.POST if request.method == "POST" else request.GET
+    sources, selected = filter_history(scope, params)
+    if 'download-csv' in request.path:
+        return export_attendance(sources)
+    rows, next_cursor = history_page(sources)
 
     data = {
-        'students': Student.objects.filter(center=request.user),
-        'teachers': Teacher.objects.filter(center=request.user),
-        'courses': Course.objects.filter(center=request.user),
-        'attendances': attendances,
+        'students': scope.students(),
+        'teachers': scope.teachers(),
+        'courses': scope.courses(),
+        'attendances': [serialize_row(row) for row in rows],
+        'total': history_count(sources),
+        'next_cursor': next_cursor,
+        'page_size': PAGE_SIZE,
+        'query': urlencode({key: params[key] for key in ('a', 'b', 'student', 'course', 'teacher', 'archived') if params.get(key)}),
     }
+    data.update(selected)
+    return render(request, "marking-attendance/history.html", data)
 
-    if request.method == "POST":
-        a = request.GET.get('a')
-        b = request.GET.get('b')
-        student = request.GET.get('student')
-        course = request.GET.get('course')
-        teacher = request.GET.get('teacher')
-
-        # start building query
-        filters = Q(center=request.user)
-
-        if a and b:
-            data['a'] = a
-            data['b'] = b
-            a = datetime.strptime(a, "%Y-%m-%d").date()
-            b = datetime.strptime(b, "%Y-%m-%d").date()
-            filters &= Q(time__range=(a, b))
-
-        if student and student != 'all':
-            filters &= Q(student_id=student)
-            data['student'] = Student.objects.get(pk=student)
-
-        if course and course != 'all':
-            filters &= Q(course_id=course)
-            data['course'] = Course.objects.get(pk=course)
-
-        if teacher and teacher != 'all':
-            filters &= Q(course__course_teacher_id=teacher)
-            data['teacher'] = Teacher.objects.get(pk=teacher)
-
-        data['attendances'] = Attendance.objects.filter(filters).order_by('-time')
+@login_required
+@role_required('admin', 'teacher', json=True)
+@replica_reads
+def history_data(request):
+    # Server-side endpoint for the DataTables history table.
+    scope = history_scope(request.role, request.user)
+    sources, _ = filter_history(scope, request.GET)
+    try:
+        draw = int(request.GET.get('draw', 0) or 0)
+        start = max(int(request.GET.get('start', 0)), 0)
+        length = min(max(int(request.GET.get('length', PAGE_SIZE)), 1), 100)
+    except ValueError:
+        draw, start, length = 0, 0, PAGE_SIZE
+    rows, next_cursor = history_page(
+        sources, cursor=request.GET.get('cursor'), start=start, size=length
+    )
+    total = history_count(sources)
+    return JsonResponse({
+        "draw": draw,
+        "recordsTotal": total,
+        "recordsFiltered": total,
+        "data": [serialize_row(row) for row in rows],
+        "next_cursor": next_cursor,
+    })
 
-    return render(request, "marking-attendance/history.html", data)
+@login_required
+@role_required('admin', json=True)
+def insight_status(request):
+    insight = Insight.objects.filter(center=request.user).first()
+    stale = jobs.is_stale(insight)
+    if stale:
+        jobs.enqueue_insight(request.user)
+    return JsonResponse({
+        "text": insight.text if insight else "",
+        "generated_at": insight.generated_at.isoformat() if insight and insight.generated_at else None,
+        "stale": stale,
+    })
 
 def zedia(request):
     return HttpResponse("zedai")
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""JSON payloads for the dashboard widgets, one function per widget.
+
+Each builder takes the viewer's analytics.Scope and the request's GET
+parameters and returns something json-serializable. Widgets with several
+queries also have an async builder in ASYNC_WIDGETS, so an ASGI worker
+keeps serving other requests while they run; Django's async ORM still
+runs them one after another on its single sync thread.
+"""
+import asyncio
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.urls import reverse
+from django.utils import formats, timezone
+
+from attendance_tracker import analytics
+from attendance_tracker.history import parse_date
+
+
+def widget_scope(request):
+    """(scope, center_id) for a center or teacher account; None for anyone else."""
+    if request.role == 'teacher':
+        return analytics.Scope(teacher=request.user), request.center_id
+    if request.role == 'admin':
+        return analytics.Scope(center=request.user), request.user.pk
+    return None
+
+
+def trend_range(params):
+    """(start, end) from either ?a=YYYY-MM-DD&b=YYYY-MM-DD or ?days=N; (None, None) for all time."""
+    days = params.get('days')
+    if days and days.isdigit():
+        today = timezone.localdate()
+        return today - timedelta(days=int(days)), today
+    start, end = parse_date(params.get('a')), parse_date(params.get('b'))
+    if start and end:
+        return start, end
+    return None, None
+
+
+def _student(student):
+    return {
+        "name": f"{student.first_name} {student.last_name}",
+        "url": reverse('student-details', args=[student.pk]),
+        "course": student.course.course_name,
+        "course_url": reverse('course-details', args=[student.course_id]),
+    }
+
+
+def summary(scope, params):
+    today = timezone.localdate()
+    data = analytics.overview(scope, today)
+    data.update(analytics.today_summary(scope, today))
+    data["attendance_rate"] = analytics.attendance_rate(scope)
+    data["teachers_count"] = scope.teachers().count()
+    return data
+
+
+async def asummary(scope, params):
+    today = timezone.localdate()
+    overview, today_data, rate, teachers = await asyncio.gather(
+        analytics.aoverview(scope, today),
+        analytics.atoday_summary(scope, today),
+        analytics.aattendance_rate(scope),
+        scope.teachers().acount(),
+    )
+    return {**overview, **today_data, "attendance_rate": rate, "teachers_count": teachers}
+
+
+def trend(scope, params):
+    return analytics.trend(scope, *trend_range(params))
+
+
+def gender(scope, params):
+    return analytics.gender_breakdown(scope)
+
+
+def ranked_students(scope, params):
+    ranked = analytics.ranked_students(scope)
+    return {
+        key: [{**_student(s), "rate": s.attendance_rate or 0} for s in students]
+        for key, students in (("top", ranked["top_students"]), ("low", ranked["students_low_attendance"]))
+    }
+
+
+def regular_students(scope, params):
+    return [
+        {**_student(s), "lessons": s.total_lessons, "absent": s.absent}
+        for s in analytics.most_regular_students(scope)
+    ]
+
+
+def recent(scope, params):
+    return [
+        {
+            "student": f"{r.student.first_name} {r.student.last_name}",
+            "student_url": reverse('student-details', args=[r.student_id]),
+            "course": r.course.course_name,
+            "course_url": reverse('course-details', args=[r.course_id]),
+            "course_time": formats.time_format(r.course.course_time, 'TIME_FORMAT'),
+            "time": formats.date_format(timezone.localtime(r.time), 'DATETIME_FORMAT'),
+            "teacher": str(r.student.course.course_teacher),
+            "teacher_url": reverse('teacher-details', args=[r.student.course.course_teacher_id]),
+            "status": r.status,
+        }
+        for r in analytics.recent_records(scope)
+    ]
+
+
+WIDGETS = {
+    'summary': summary,
+    'trend': trend,
+    'gender': gender,
+    'ranked-students': ranked_students,
+    'regular-students': regular_students,
+    'recent': recent,
+}
+
+ASYNC_WIDGETS = {
+    'summary': asummary,
+}
+
+
+async def abuild(name, scope, params):
+    """The payload of widget `name`, from its async builder or its sync one in a thread."""
+    if name in ASYNC_WIDGETS:
+        return await ASYNC_WIDGETS[name](scope, params)
+    return await sync_to_async(WIDGETS[name])(scope, params)
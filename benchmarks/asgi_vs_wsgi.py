@@ -0,0 +1,178 @@
+"""Compare dashboard latency under concurrent requests: WSGI vs ASGI.
+
+Run from the project root (needs uvicorn and httpx):
+
+    python -m benchmarks.asgi_vs_wsgi --scale medium --concurrency 1 8 32 --requests 200
+
+Each mode serves the same generated data from its own server process:
+
+    wsgi       manage.py runserver (threaded), sync views
+    asgi       uvicorn config.asgi:application with ASYNC_DASHBOARDS on
+    asgi-sync  uvicorn with the sync views, for reference
+
+Requests cycle through the dashboard shell and its widgets as the center
+account. Every request carries a unique query parameter, so widgets are
+computed instead of served from the center cache.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.views import SCALES, setup_django
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PATHS = [
+    '/',
+    '/widgets/summary/',
+    '/widgets/trend/?days=30',
+    '/widgets/ranked-students/',
+    '/widgets/regular-students/',
+    '/widgets/recent/',
+]
+
+MODES = {
+    'wsgi': (['manage.py', 'runserver', '127.0.0.1:{port}', '--noreload'], False),
+    'asgi': (['-m', 'uvicorn', 'config.asgi:application', '--port', '{port}', '--log-level', 'warning'], True),
+    'asgi-sync': (['-m', 'uvicorn', 'config.asgi:application', '--port', '{port}', '--log-level', 'warning'], False),
+}
+
+SETTINGS = """
+from config.settings import *
+
+DATABASES['default']['NAME'] = {database!r}
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1']
+REQUEST_TIMING = False
+"""
+
+
+def prepare(scale, seed):
+    """Write a settings module pointing at a fresh database, fill it, and return a session cookie."""
+    work_dir = tempfile.mkdtemp(prefix='zedtrack-bench-asgi-')
+    Path(work_dir, 'bench_settings.py').write_text(
+        SETTINGS.format(database=os.path.join(work_dir, 'bench.sqlite3'))
+    )
+    sys.path.insert(0, work_dir)
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'bench_settings'
+    os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, [work_dir, str(ROOT), os.environ.get('PYTHONPATH')]))
+    setup_django()
+
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.test import Client
+
+    from attendance_tracker import synthetic
+
+    call_command('migrate', verbosity=0)
+    synthetic.generate(seed=seed, **SCALES[scale])
+    client = Client()
+    client.force_login(User.objects.get(username='synth-center-0'))
+    return {settings.SESSION_COOKIE_NAME: client.cookies[settings.SESSION_COOKIE_NAME].value}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode, port):
+    args, async_views = MODES[mode]
+    env = dict(os.environ, ASYNC_DASHBOARDS='true' if async_views else 'false')
+    server = subprocess.Popen(
+        [sys.executable] + [arg.format(port=port) for arg in args],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"The {mode} server exited with code {server.returncode}.")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit(f"The {mode} server did not start within 30 seconds.")
+
+
+async def load(base_url, cookies, concurrency, total):
+    import httpx
+
+    latencies, errors = [], 0
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async def worker(client):
+        nonlocal errors
+        for i in counter:
+            path = PATHS[i % len(PATHS)]
+            separator = '&' if '?' in path else '?'
+            start = time.perf_counter()
+            response = await client.get(f"{path}{separator}nonce={i}")
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    async with httpx.AsyncClient(base_url=base_url, cookies=cookies, limits=limits, timeout=120) as client:
+        await client.get('/index/')
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'p50_ms': round(statistics.median(latencies), 1),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1], 1),
+        'max_ms': round(latencies[-1], 1),
+        'requests_per_second': round(total / elapsed, 1),
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=120, help="Requests per concurrency level.")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        import httpx  # noqa: F401
+        if any(mode.startswith('asgi') for mode in args.modes):
+            import uvicorn  # noqa: F401
+    except ImportError as e:
+        raise SystemExit(f"{e.name} is not installed: pip install uvicorn httpx")
+
+    cookies = prepare(args.scale, args.seed)
+    results = {}
+    for mode in args.modes:
+        port = free_port()
+        server = start_server(mode, port)
+        try:
+            results[mode] = {}
+            for concurrency in args.concurrency:
+                result = asyncio.run(load(f"http://127.0.0.1:{port}", cookies, concurrency, args.requests))
+                results[mode][concurrency] = result
+                print(f"  {mode:<10} c={concurrency:<4} p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms"
+                      f"  {result['requests_per_second']:7.1f} req/s  {result['errors']} errors", file=sys.stderr)
+        finally:
+            server.terminate()
+            server.wait()
+    print(json.dumps({'scale': args.scale, 'cpus': os.cpu_count(), 'requests': args.requests, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
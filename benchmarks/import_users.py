@@ -0,0 +1,117 @@
+"""Compare bulk CSV student import with creating students one at a time.
+
+Run from the project root:
+
+    python -m benchmarks.import_users --rows 500 --workers 1 4 8
+
+"one_by_one" is what add_student does for each form post: create_user
+(one password hash) and Student.objects.create. "import_N" runs
+accounts.imports.import_csv with N hashing processes. Every scenario gets
+its own center in a fresh temporary SQLite database.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.views import setup_django
+
+
+def make_csv(rows, prefix, course):
+    lines = ["username,password,first_name,last_name,phone_number,gender,course"]
+    lines += [f"{prefix}-{i},pass-{i}-word,First{i},Last{i},+99890{i:07d},{'MF'[i % 2]},{course}" for i in range(rows)]
+    return "\n".join(lines) + "\n"
+
+
+def make_center(name):
+    from django.contrib.auth.models import User
+
+    from courses.models import Course
+    from teachers.models import Teacher
+
+    center = User.objects.create_user(name, password=None)
+    teacher = Teacher.objects.create(
+        first_name='Bench', last_name='Teacher', phone_number='0', center=center,
+        user=User.objects.create_user(f'{name}-teacher', password=None),
+    )
+    course = Course.objects.create(
+        course_name='Bench', course_teacher=teacher, course_time='09:00', days=['Mon'],
+        description='', center=center,
+    )
+    return center, course
+
+
+def one_by_one(rows, center, course):
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+
+    from students.models import Student
+
+    for i in range(rows):
+        user = User.objects.create_user(username=f'{center.username}-{i}', password=f'pass-{i}-word')
+        Student.objects.create(
+            first_name=f'First{i}', last_name=f'Last{i}', gender='MF'[i % 2], course=course,
+            registration_date=timezone.now().date(), center=center, user=user,
+        )
+
+
+def run(rows, workers):
+    from django.db import connection
+
+    from accounts.imports import import_csv
+
+    db_dir = tempfile.mkdtemp(prefix='zedtrack-bench-db-')
+    connection.settings_dict['TEST']['NAME'] = os.path.join(db_dir, 'import.sqlite3')
+    db_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    results = {}
+    try:
+        center, course = make_center('one-by-one')
+        start = time.perf_counter()
+        one_by_one(rows, center, course)
+        results['one_by_one'] = time.perf_counter() - start
+
+        for count in workers:
+            center, course = make_center(f'import-{count}')
+            text = io.StringIO(make_csv(rows, center.username, course.course_name))
+            start = time.perf_counter()
+            report = import_csv('students', center, text, workers=count)
+            results[f'import_{count}'] = time.perf_counter() - start
+            if report['errors'] or report['created'] != rows:
+                raise SystemExit(f"import_{count} failed: {report['errors'][:3]}")
+    finally:
+        connection.creation.destroy_test_db(db_name, verbosity=0)
+
+    baseline = results['one_by_one']
+    return {
+        name: {
+            'seconds': round(seconds, 2),
+            'rows_per_second': round(rows / seconds, 1),
+            'speedup': round(baseline / seconds, 2),
+        }
+        for name, seconds in results.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1],
+                        help="Hashing process counts to try.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    results = run(args.rows, args.workers)
+    for name, result in results.items():
+        print(f"  {name:<12} {result['seconds']:8.2f} s  {result['rows_per_second']:8.1f} rows/s"
+              f"  {result['speedup']:5.2f}x", file=sys.stderr)
+    print(json.dumps({'rows': args.rows, 'cpus': os.cpu_count(), 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
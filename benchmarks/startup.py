@@ -0,0 +1,67 @@
+"""Measure process start-up: django.setup() plus loading the URLconf.
+
+Run from the project root:
+
+    python -m benchmarks.startup --runs 10
+
+The "lazy" scenario is what a worker, ``manage.py migrate`` or the test
+runner pays today. The "eager" scenario also loads the zedAI backend and
+the forecast dependencies up front, which is what every process paid
+when they were imported by the views.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ['vertexai', 'numpy', 'pandas', 'sklearn']
+
+SCRIPT = """
+import os, sys, time, json
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+import django
+django.setup()
+import config.urls
+if {eager}:
+    import numpy
+    from attendance_tracker.ai import VertexBackend
+    VertexBackend().model
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy} if m in sys.modules]}}))
+"""
+
+
+def measure(eager, runs):
+    timings, loaded = [], []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', SCRIPT.format(eager=eager, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result['seconds'])
+        loaded = result['loaded']
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "min_ms": round(min(timings) * 1000, 1),
+        "heavy_modules_loaded": loaded,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--skip-eager', action='store_true', help="Skip the scenario that needs google-cloud-aiplatform.")
+    args = parser.parse_args()
+
+    results = {"lazy": measure(False, args.runs)}
+    if not args.skip_eager:
+        results["eager"] = measure(True, args.runs)
+        results["saving_ms"] = round(results["eager"]["median_ms"] - results["lazy"]["median_ms"], 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
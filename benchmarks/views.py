@@ -0,0 +1,196 @@
+"""Time the main views against generated data at several scales.
+
+Run from the project root:
+
+    python -m benchmarks.views --scales small medium --runs 5
+    python -m benchmarks.views --scales small --compare benchmarks/results/views-abc1234.json
+
+Each scale gets a fresh temporary SQLite file filled by
+attendance_tracker.synthetic. Every scenario is requested once with an
+empty cache ("cold") and then --runs more times ("warm"); query counts
+and wall times go to a JSON file named after the current commit.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+SCALES = {
+    'small': {'centers': 1, 'teachers': 5, 'students': 100, 'days': 30},
+    'medium': {'centers': 1, 'teachers': 20, 'students': 1000, 'days': 90},
+    'large': {'centers': 1, 'teachers': 50, 'students': 5000, 'days': 180},
+}
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    # Keep benchmark entries out of the project's shared cache directory.
+    os.environ['CACHE_DIR'] = tempfile.mkdtemp(prefix='zedtrack-bench-cache-')
+    import django
+
+    django.setup()
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def scenarios(center):
+    from django.urls import reverse
+    from django.utils import timezone
+
+    from courses.models import Course
+    from students.models import Student
+
+    course = (
+        Course.objects.on_weekday(timezone.localdate()).filter(center=center)
+        .select_related('course_teacher__user').first()
+    )
+    if course is None:
+        course = Course.objects.filter(center=center).select_related('course_teacher__user').first()
+    teacher_user = course.course_teacher.user
+    student = Student.objects.filter(center=center).first()
+    statuses = {
+        f'status-{pk}': 'present' if i % 4 else 'absent'
+        for i, pk in enumerate(Student.objects.filter(course=course).values_list('pk', flat=True))
+    }
+
+    return [
+        ('dashboard', center, 'get', reverse('dashboard'), None),
+        ('widget_summary', center, 'get', reverse('dashboard-widget', args=['summary']), None),
+        ('widget_trend', center, 'get', reverse('dashboard-widget', args=['trend']), {'days': 30}),
+        ('teacher_dashboard', teacher_user, 'get', reverse('teacher-dashboard'), None),
+        ('marking_get', teacher_user, 'get', reverse('selected-course', args=[course.pk]), None),
+        ('marking_post', teacher_user, 'post', reverse('selected-course', args=[course.pk]), statuses),
+        ('history', center, 'get', reverse('attendance-history'), None),
+        ('student_details', center, 'get', reverse('student-details', args=[student.pk]), None),
+        ('export_students', center, 'get', reverse('student-list-csv'), None),
+        ('export_teachers', center, 'get', reverse('teacher-list-csv'), None),
+        ('export_attendance', center, 'get', reverse('attendance-history-csv'), None),
+    ]
+
+
+def request_once(client, method, url, data):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        response = getattr(client, method)(url, data or {})
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        elapsed = time.perf_counter() - start
+    return response.status_code, len(queries), elapsed * 1000
+
+
+def run_scale(scale, runs, seed):
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+
+    from attendance_tracker import synthetic
+
+    # A throwaway file per scale: closer to production than SQLite's shared
+    # in-memory test database, and nothing leaks from one scale into the next.
+    db_dir = tempfile.mkdtemp(prefix='zedtrack-bench-db-')
+    connection.settings_dict['TEST']['NAME'] = os.path.join(db_dir, f'{scale}.sqlite3')
+    db_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        start = time.perf_counter()
+        counts = synthetic.generate(seed=seed, **SCALES[scale])
+        generate_seconds = time.perf_counter() - start
+        center = User.objects.get(username='synth-center-0')
+
+        results = {}
+        clients = {}
+        for name, user, method, url, data in scenarios(center):
+            if user.pk not in clients:
+                clients[user.pk] = Client()
+                clients[user.pk].force_login(user)
+            client = clients[user.pk]
+
+            cache.clear()
+            status, cold_queries, cold_ms = request_once(client, method, url, data)
+            warm = [request_once(client, method, url, data) for _ in range(runs)]
+            warm_ms = [ms for _, _, ms in warm]
+            results[name] = {
+                'status': status,
+                'queries_cold': cold_queries,
+                'queries_warm': warm[-1][1] if warm else cold_queries,
+                'cold_ms': round(cold_ms, 2),
+                'median_ms': round(statistics.median(warm_ms), 2) if warm_ms else None,
+                'min_ms': round(min(warm_ms), 2) if warm_ms else None,
+            }
+            print(f"  {scale:<7} {name:<18} {status}  {cold_queries:>3}q cold {cold_ms:8.1f} ms"
+                  f"  warm median {results[name]['median_ms']} ms", file=sys.stderr)
+        return {'size': SCALES[scale], 'rows': counts, 'generate_seconds': round(generate_seconds, 2), 'views': results}
+    finally:
+        connection.creation.destroy_test_db(db_name, verbosity=0)
+
+
+def compare(current, baseline):
+    print(f"{'scale':<8}{'view':<20}{'queries':>14}{'median ms':>22}")
+    for scale, result in current['scales'].items():
+        old_views = baseline.get('scales', {}).get(scale, {}).get('views', {})
+        for name, new in result['views'].items():
+            old = old_views.get(name)
+            if not old:
+                continue
+            ratio = new['median_ms'] / old['median_ms'] if old['median_ms'] else float('nan')
+            print(f"{scale:<8}{name:<20}{old['queries_cold']:>6} -> {new['queries_cold']:<6}"
+                  f"{old['median_ms']:>9} -> {new['median_ms']:<9} ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', nargs='+', choices=sorted(SCALES), default=['small'])
+    parser.add_argument('--runs', type=int, default=5, help="Warm requests per view after the cold one.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Where to write the JSON results (default: benchmarks/results/views-<commit>.json).")
+    parser.add_argument('--compare', help="A previous results file to compare against.")
+    args = parser.parse_args()
+
+    setup_django()
+    import django
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    results = {
+        'commit': commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'runs': args.runs,
+        'seed': args.seed,
+        'scales': {scale: run_scale(scale, args.runs, args.seed) for scale in args.scales},
+    }
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"views-{results['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Send the heavy, read-only views to the `replica` database.
+
+Reads go to the replica only inside views wrapped in `replica_reads`, and
+only for the app data (students, teachers, courses, attendance); sessions
+and auth stay on `default`. Every write goes to `default`. A user who has
+just written is pinned to `default` for REPLICA_PIN_SECONDS, so they see
+their own changes before replication catches up.
+
+Without a `replica` entry in DATABASES all of this is a no-op, and so it
+is when the replica is default itself, as in tests, where it mirrors
+default: reading through a second connection would gain nothing and, on
+SQLite, would not see the test's uncommitted rows.
+"""
+import contextvars
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+REPLICA = 'replica'
+REPLICA_APPS = {'attendance_tracker', 'courses', 'students', 'teachers'}
+PIN_SESSION_KEY = '_primary_until'
+
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+_wrote = contextvars.ContextVar('wrote', default=None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias and model._meta.app_label in REPLICA_APPS:
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        wrote = _wrote.get()
+        if wrote is not None and model._meta.app_label in REPLICA_APPS:
+            wrote.append(model._meta.label)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of default, so objects from either may be related.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The schema reaches the replica through replication (sync_replica).
+        return db != REPLICA
+
+
+def has_replica():
+    if REPLICA not in connections.databases:
+        return False
+    return str(connections[REPLICA].settings_dict['NAME']) != str(connections['default'].settings_dict['NAME'])
+
+
+def is_pinned(request):
+    session = getattr(request, 'session', None)
+    return session is not None and session.get(PIN_SESSION_KEY, 0) > time.time()
+
+
+def _on_replica(content):
+    # Streamed responses run their queries after the view has returned.
+    iterator = iter(content)
+    while True:
+        token = _read_alias.set(REPLICA)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _read_alias.reset(token)
+        yield chunk
+
+
+def replica_reads(view):
+    """Run `view`'s reads of app data against the replica, unless the user is pinned to default."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if not has_replica() or await sync_to_async(is_pinned)(request):
+                return await view(request, *args, **kwargs)
+            token = _read_alias.set(REPLICA)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _read_alias.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not has_replica() or is_pinned(request):
+            return view(request, *args, **kwargs)
+        token = _read_alias.set(REPLICA)
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+        if response.streaming:
+            response.streaming_content = _on_replica(response.streaming_content)
+        return response
+    return wrapper
+
+
+class PrimaryPinMiddleware:
+    """Pin a user's reads to default for REPLICA_PIN_SECONDS after a request that wrote app data."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not has_replica():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        wrote = []
+        token = _wrote.set(wrote)
+        try:
+            response = self.get_response(request)
+        finally:
+            _wrote.reset(token)
+        if wrote:
+            self.pin(request)
+        return response
+
+    async def __acall__(self, request):
+        wrote = []
+        token = _wrote.set(wrote)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _wrote.reset(token)
+        if wrote:
+            await sync_to_async(self.pin)(request)
+        return response
+
+    def pin(self, request):
+        if request.user.is_authenticated:
+            request.session[PIN_SESSION_KEY] = time.time() + settings.REPLICA_PIN_SECONDS
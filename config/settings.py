@@ -45,11 +45,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'attendance_tracker.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.RoleMiddleware',
+    'config.routers.PrimaryPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "allauth.account.middleware.AccountMiddleware",
@@ -59,7 +62,8 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render time to RequestTimingMiddleware.
+        'BACKEND': 'attendance_tracker.timing.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -79,9 +83,51 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Take the write lock when a transaction starts, so two requests
+        # marking the same class queue up instead of one failing with
+        # "database is locked" when it goes from reading to writing.
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
     }
 }
 
+# Optional read replica for dashboards, history and exports (config.routers).
+# With SQLite, point REPLICA_DATABASE at a second file and keep it fresh
+# with `python manage.py sync_replica`, which stands in for replication.
+REPLICA_DATABASE = env.str("REPLICA_DATABASE", "")
+# After writing, a user reads from default for this long.
+REPLICA_PIN_SECONDS = env.int("REPLICA_PIN_SECONDS", 10)
+if REPLICA_DATABASE:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': REPLICA_DATABASE,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['config.routers.ReplicaRouter']
+
+# File-based so every worker process sees the same entries and versions
+# (see attendance_tracker.caching); point CACHE_DIR at shared storage.
+# Widget, calendar and role entries run to one per user, page and month,
+# and entries under old center versions linger until they expire, so the
+# cap is well above Django's default of 300. Past it, every set drops a
+# tenth of the entries.
+CACHE_DIR = env.str("CACHE_DIR", str(BASE_DIR / '.cache'))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR,
+        'OPTIONS': {
+            'MAX_ENTRIES': env.int("CACHE_MAX_ENTRIES", 50_000),
+            'CULL_FREQUENCY': 10,
+        },
+    },
+    # The cache hit/miss counters, kept apart so culling the default cache
+    # never resets them.
+    'counters': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'counters'),
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -134,3 +180,82 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Processes hashing passwords during CSV imports of students and teachers
+# (run_import_worker); 1 hashes in the worker process itself.
+IMPORT_HASH_WORKERS = env.int("IMPORT_HASH_WORKERS", os.cpu_count() or 1)
+# Uploaded CSVs, plaintext passwords included, wait here until the worker
+# has imported them; it must be shared by the web and worker processes.
+IMPORT_UPLOAD_DIR = env.str("IMPORT_UPLOAD_DIR", str(BASE_DIR / '.imports'))
+
+# Days of attendance kept in the live table; archive_attendance moves
+# older rows to the archive, which history can still search on request.
+ATTENDANCE_HOT_DAYS = env.int("ATTENDANCE_HOT_DAYS", 365)
+
+# Sync API idempotency keys are remembered this long; older ones are pruned
+# on the user's next upload or by `manage.py prune_idempotency_keys`.
+IDEMPOTENCY_KEY_DAYS = env.int("IDEMPOTENCY_KEY_DAYS", 30)
+
+# zedAI backend: "vertex", "local" (rule-based, no network), "disabled",
+# or a dotted path to a custom backend class.
+AI_BACKEND = env.str("AI_BACKEND", "vertex")
+VERTEX_PROJECT = env.str("VERTEX_PROJECT", "zedtrack-ai-assistant")
+VERTEX_LOCATION = env.str("VERTEX_LOCATION", "us-central1")
+VERTEX_MODEL = env.str("VERTEX_MODEL", "gemini-2.5-flash-lite")
+
+# Seconds to wait for the zedAI backend before falling back to the local
+# rule-based report.
+AI_TIMEOUT_SECONDS = env.float("AI_TIMEOUT_SECONDS", 30)
+
+# Cached zedAI insights older than this are regenerated by the insight worker.
+INSIGHT_MAX_AGE_MINUTES = env.int("INSIGHT_MAX_AGE_MINUTES", 60)
+# A running insight job older than this is taken to have lost its worker
+# and is queued again.
+INSIGHT_JOB_TIMEOUT_MINUTES = env.int("INSIGHT_JOB_TIMEOUT_MINUTES", 10)
+# After a failed insight job, wait this long before queueing another one.
+INSIGHT_RETRY_MINUTES = env.int("INSIGHT_RETRY_MINUTES", 15)
+# Size cap for the insight prompt, in characters (roughly 4 per token).
+# Students past the cap are left out, lowest recent attendance kept first.
+INSIGHT_PROMPT_CHARS = env.int("INSIGHT_PROMPT_CHARS", 12000)
+
+# Serve the admin and teacher dashboards and their widgets from async views.
+# Turn on when running under an ASGI server (uvicorn config.asgi:application).
+ASYNC_DASHBOARDS = env.bool("ASYNC_DASHBOARDS", False)
+
+# Upper bound for per-center cached pages; any change to the center's data
+# invalidates them sooner.
+CENTER_CACHE_SECONDS = env.int("CENTER_CACHE_SECONDS", 60 * 60)
+
+# Per-request DB/view/template timings as a Server-Timing header and a
+# JSON log line, and per-job DB/AI timings from the insight worker;
+# queries slower than SLOW_QUERY_MS go to SLOW_QUERY_LOG.
+REQUEST_TIMING = env.bool("REQUEST_TIMING", DEBUG)
+SLOW_QUERY_MS = env.int("SLOW_QUERY_MS", 200)
+SLOW_QUERY_LOG = env.str("SLOW_QUERY_LOG", str(BASE_DIR / 'slow_queries.log'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+        'slow_queries': {
+            'class': 'logging.FileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'attendance_tracker.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'attendance_tracker.slow_queries': {
+            'handlers': ['slow_queries', 'console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
@@ -1,13 +1,17 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 
 from attendance_tracker.views import *
 
+dashboard_view = dashboard_async if settings.ASYNC_DASHBOARDS else dashboard
+widget_view = dashboard_widget_async if settings.ASYNC_DASHBOARDS else dashboard_widget
+
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('', dashboard, name='dashboard'),
-    path('<str:a>-to-<str:b>/', dashboard, name='dashboard'),
-    path('<int:c>/', dashboard, name='dashboard'),
+    path('', dashboard_view, name='dashboard'),
+    path('<str:a>-to-<str:b>/', dashboard_view, name='dashboard'),
+    path('<int:c>/', dashboard_view, name='dashboard'),
     path('index/', index, name='index'),
     path('courses/', include('courses.urls')),
     path('teachers/', include('teachers.urls')),
@@ -15,5 +19,7 @@ urlpatterns = [
     path('marking-attendace/', include('attendance_tracker.urls')),
     path('accounts/', include('allauth.urls')),
     path('zedai/', zedia, name='zedai'),
+    path('insights/', insight_status, name='insight-status'),
+    path('widgets/<slug:name>/', widget_view, name='dashboard-widget'),
 
 ]
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from courses.models import Course
+from courses.models import Course, CourseSchedule
 
 # Register your models here.
 admin.site.register(Course)
+admin.site.register(CourseSchedule)
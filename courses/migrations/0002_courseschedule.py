@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+
+def backfill_schedule(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    CourseSchedule = apps.get_model('courses', 'CourseSchedule')
+    CourseSchedule.objects.bulk_create(
+        (
+            CourseSchedule(course_id=course.pk, weekday=WEEKDAYS.index(day))
+            for course in Course.objects.only('id', 'days').iterator()
+            for day in set(course.days) if day in WEEKDAYS
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Mon'), (1, 'Tue'), (2, 'Wed'), (3, 'Thu'), (4, 'Fri'), (5, 'Sat'), (6, 'Sun')])),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule', to='courses.course')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['weekday', 'course'], name='course_schedule_weekday')],
+                'constraints': [models.UniqueConstraint(fields=('course', 'weekday'), name='unique_course_weekday')],
+            },
+        ),
+        migrations.RunPython(backfill_schedule, migrations.RunPython.noop),
+    ]
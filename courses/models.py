@@ -5,6 +5,19 @@ from django.contrib.auth.models import User
 
 from teachers.models import Teacher
 
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+
+class CourseQuerySet(models.QuerySet):
+    def on_weekday(self, day):
+        """Courses held on `day`: a date, a weekday number (Monday is 0) or a code like 'Mon'."""
+        if hasattr(day, 'weekday'):
+            day = day.weekday()
+        elif isinstance(day, str):
+            day = WEEKDAYS.index(day)
+        return self.filter(schedule__weekday=day)
+
+
 # Create your models here.
 class Course(models.Model):
     DAYS_OF_WEEK = (
@@ -23,5 +36,42 @@ class Course(models.Model):
     description = models.TextField()
     center = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True)
 
+    objects = CourseQuerySet.as_manager()
+
+    def __str__(self):
+        return self.course_name
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.sync_schedule()
+
+    def sync_schedule(self):
+        # `days` stays the field forms edit; CourseSchedule mirrors it so
+        # weekday lookups hit an index instead of scanning the string.
+        # Only save() keeps the two in step: after QuerySet.update(days=...),
+        # bulk_create or bulk_update, call this for each course or write the
+        # CourseSchedule rows yourself (as synthetic.generate does), or
+        # on_weekday() will miss the change.
+        weekdays = {WEEKDAYS.index(day) for day in self.days if day in WEEKDAYS}
+        current = set(self.schedule.values_list('weekday', flat=True))
+        if weekdays != current:
+            self.schedule.filter(weekday__in=current - weekdays).delete()
+            CourseSchedule.objects.bulk_create(
+                CourseSchedule(course=self, weekday=weekday) for weekday in weekdays - current
+            )
+
+
+class CourseSchedule(models.Model):
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='schedule')
+    weekday = models.PositiveSmallIntegerField(choices=list(enumerate(WEEKDAYS)))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'weekday'], name='unique_course_weekday'),
+        ]
+        indexes = [
+            models.Index(fields=['weekday', 'course'], name='course_schedule_weekday'),
+        ]
+
     def __str__(self):
-        return self.course_name
\ No newline at end of file
+        return f"{self.course} ({WEEKDAYS[self.weekday]})"
\ No newline at end of file
@@ -1,3 +1,48 @@
+from datetime import date
+
+from django.contrib.auth.models import User
 from django.test import TestCase
 
-# Create your tests here.
+from courses.models import WEEKDAYS, Course
+from teachers.models import Teacher
+
+
+class ScheduleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.center = User.objects.create_user('center')
+        cls.teacher = Teacher.objects.create(
+            first_name='T', last_name='One', phone_number='1', center=cls.center,
+            user=User.objects.create_user('teacher'),
+        )
+
+    def course(self, name, days):
+        return Course.objects.create(
+            course_name=name, course_teacher=self.teacher, course_time='10:00', days=days, description='',
+            center=self.center,
+        )
+
+    def test_on_weekday(self):
+        courses = {
+            'A': self.course('A', ['Mon', 'Wed']),
+            'B': self.course('B', ['Wed', 'Sun']),
+            'C': self.course('C', []),
+        }
+        monday = date(2026, 10, 12)
+        for weekday, code in enumerate(WEEKDAYS):
+            expected = sorted(name for name, course in courses.items() if code in course.days)
+            day = date.fromordinal(monday.toordinal() + weekday)
+            for value in (weekday, code, day):
+                with self.subTest(value=value):
+                    found = Course.objects.on_weekday(value).values_list('course_name', flat=True)
+                    self.assertEqual(sorted(found), expected)
+
+    def test_schedule_follows_day_changes(self):
+        course = self.course('A', ['Mon', 'Wed'])
+        self.assertEqual(sorted(course.schedule.values_list('weekday', flat=True)), [0, 2])
+        course.days = ['Wed', 'Fri']
+        course.save()
+        self.assertEqual(sorted(course.schedule.values_list('weekday', flat=True)), [2, 4])
+        course.days = []
+        course.save()
+        self.assertFalse(course.schedule.exists())
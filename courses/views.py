@@ -1,10 +1,10 @@
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Q, ExpressionWrapper, F
-from django.db.models.fields import FloatField
-from django.db.models.functions import NullIf
+from django.db.models import Count
 from django.shortcuts import render, redirect
-from django.contrib import messages
 
+from accounts.decorators import role_required
+from attendance_tracker import caching
+from attendance_tracker.analytics import with_stats
 from courses.models import Course
 from students.models import Student
 from teachers.models import Teacher
@@ -15,33 +15,23 @@ import calendar
 
 # Create your views here.
 @login_required
+@role_required('admin', 'teacher')
 def courses_list(request):
-    if hasattr(request.user, 'student_user'):
-        messages.error(request, 'You do not have a permission.')
-        return redirect('dashboard')
     courses = Course.objects.annotate(num_students=Count('student', distinct=True)).filter(center=request.user)
-    role = "admin"
-    if hasattr(request.user, 'teacher_user'):
+    if request.role == 'teacher':
         courses = Course.objects.annotate(num_students=Count('student', distinct=True)).filter(course_teacher__user=request.user)
-        role = "teacher"
     data = {
         "courses": courses,
-        "role": role,
+        "role": request.role,
     }
     return render(request, "courses/courses_list.html", data)
 
 @login_required
+@role_required('admin')
 def add_course(request):
-    if hasattr(request.user, 'teacher_user') or hasattr(request.user, 'student_user'):
-        messages.error(request, 'You do not have a permission.')
-        return redirect('dashboard')
-    role = "admin"
-    if hasattr(request.user, 'teacher_user'):
-        courses = Course.objects.filter(course_teacher__user=request.user)
-        role = "teacher"
     data = {
         "teachers": Teacher.objects.filter(center=request.user),
-        "role": role,
+        "role": request.role,
     }
     if request.method == "POST":
         Course.objects.create(
@@ -57,10 +47,8 @@ def add_course(request):
     return render(request, "courses/add_course.html", data)
 
 @login_required
+@role_required('admin')
 def edit_course(request, id):
-    if hasattr(request.user, 'teacher_user') or hasattr(request.user, 'student_user'):
-        messages.error(request, 'You do not have a permission.')
-        return redirect('dashboard')
     if request.method == "POST":
         course = Course.objects.get(pk=id, center=request.user)
         course.course_name = request.POST.get('name')
@@ -79,10 +67,8 @@ def edit_course(request, id):
     return render(request, "courses/edit_course.html", data)
 
 @login_required
+@role_required('admin')
 def delete_confirmation_course(request, id):
-    if hasattr(request.user, 'teacher_user') or hasattr(request.user, 'student_user'):
-        messages.error(request, 'You do not have a permission.')
-        return redirect('dashboard')
     course = Course.objects.get(pk=id, center=request.user)
     data = {
         "course": course,
@@ -90,39 +76,21 @@ def delete_confirmation_course(request, id):
     return render(request, "courses/delete_confirmation_course.html", data)
 
 @login_required
+@role_required('admin')
 def delete_course(request, id):
-    if hasattr(request.user, 'teacher_user') or hasattr(request.user, 'student_user'):
-        messages.error(request, 'You do not have a permission.')
-        return redirect('dashboard')
     Course.objects.get(pk=id, center=request.user).delete()
     return redirect('course-list')
 
 @login_required
 def course_details(request, id):
-    if hasattr(request.user, 'teacher_user'):
+    if request.role == 'teacher':
         course = Course.objects.get(pk=id, course_teacher__user=request.user)
-        students = Student.objects.annotate(
-            total=Count('attendance'),
-            present=Count('attendance', filter=Q(attendance__status=True)),
-        ).annotate(
-            attendance_rate=ExpressionWrapper(
-                100.0 * F('present') / NullIf(F('total'), 0),
-                output_field=FloatField()
-            )
-        ).filter(course=course, course__course_teacher__user=request.user)
-    elif hasattr(request.user, 'student_user'):
+        students = with_stats(Student.objects.filter(course=course, course__course_teacher__user=request.user))
+    elif request.role == 'student':
         return redirect('dashboard')
     else:
         course = Course.objects.get(pk=id, center=request.user)
-        students = Student.objects.annotate(
-            total=Count('attendance'),
-            present=Count('attendance', filter=Q(attendance__status=True)),
-        ).annotate(
-            attendance_rate=ExpressionWrapper(
-                100.0 * F('present') / NullIf(F('total'), 0),
-                output_field=FloatField()
-            )
-        ).filter(course=course, center=request.user)
+        students = with_stats(Student.objects.filter(course=course, center=request.user))
 
     day_map = {
         'Mon': 0, 'Monday': 0,
@@ -151,7 +119,7 @@ def course_details(request, id):
 
     data = {
         "course": course,
-        "students": students,
+        "students": caching.get_or_compute(course.center_id, f"course-students:{course.pk}", lambda: list(students)),
         "calendar_weeks": weeks,
         "month_name": today.strftime("%B"),
         "year": year,
@@ -0,0 +1,113 @@
+/*
+Dashboard widgets: each one is fetched from its own JSON endpoint
+(dashboard_widget) as soon as the page shell is parsed. The requests run
+in parallel, and the server answers 304 while the center's data is
+unchanged, so revisits are served from the browser cache.
+*/
+(function () {
+    function load(url, query) {
+        if (query) url += "?" + query;
+        return fetch(url, { credentials: "same-origin", headers: { "Accept": "application/json" } })
+            .then(function (response) {
+                if (!response.ok) throw new Error(url + ": " + response.status);
+                return response.json();
+            });
+    }
+
+    function link(text, href) {
+        const a = document.createElement("a");
+        a.href = href;
+        a.title = "Details";
+        a.style.color = "var(--text-color)";
+        a.textContent = text;
+        return a;
+    }
+
+    function cell(content, align) {
+        const td = document.createElement("td");
+        td.style.color = "var(--text-color)";
+        if (align) td.style.textAlign = align;
+        if (content instanceof Node) td.appendChild(content); else td.textContent = content;
+        return td;
+    }
+
+    function fillRows(tbody, rows, columns) {
+        if (!tbody) return;
+        tbody.replaceChildren(...rows.map(function (row) {
+            const tr = document.createElement("tr");
+            columns(row).forEach(function (td) { tr.appendChild(td); });
+            return tr;
+        }));
+    }
+
+    function animateCount(item, target) {
+        const type = item.dataset.type; // "number" or "percent"
+        const step = Math.max(1, Math.ceil(target / (2000 / 50)));
+        let current = 0;
+        const stop = setInterval(function () {
+            current = Math.min(current + step, target);
+            if (current >= target) {
+                clearInterval(stop);
+                current = type === "percent" ? Math.round(target * 100) / 100 : target;
+            }
+            item.textContent = type === "percent" ? current + "%" : current;
+        }, 50);
+    }
+
+    function fillCounts(data) {
+        document.querySelectorAll("[data-widget-field]").forEach(function (item) {
+            const value = Number(data[item.dataset.widgetField] || 0);
+            if (item.classList.contains("count")) {
+                animateCount(item, value);
+            } else {
+                item.textContent = item.dataset.type === "percent" ? value.toFixed(2) + "%" : value;
+            }
+        });
+    }
+
+    function lineChart(canvas, data, color) {
+        if (!canvas) return null;
+        const existing = Chart.getChart(canvas);
+        if (existing) {
+            existing.data.labels = data.labels;
+            existing.data.datasets[0].data = data.values;
+            existing.update();
+            return existing;
+        }
+        return new Chart(canvas, {
+            type: "line",
+            data: {
+                labels: data.labels,
+                datasets: [{
+                    label: "Attendance Records",
+                    data: data.values,
+                    backgroundColor: color,
+                    borderColor: color,
+                    borderWidth: 1
+                }]
+            },
+            options: { responsive: true, scales: { y: { beginAtZero: true } } }
+        });
+    }
+
+    function doughnutChart(canvas, data, colors) {
+        if (!canvas) return null;
+        return new Chart(canvas, {
+            type: "doughnut",
+            data: {
+                labels: data.labels,
+                datasets: [{ data: data.values, borderColor: colors, backgroundColor: colors }]
+            }
+        });
+    }
+
+    window.dashboardWidgets = {
+        load: load,
+        link: link,
+        cell: cell,
+        fillRows: fillRows,
+        fillCounts: fillCounts,
+        lineChart: lineChart,
+        doughnutChart: doughnutChart
+    };
+})();
@@ -1,3 +1,123 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance_tracker import archive, caching
+from attendance_tracker.models import Attendance, StudentStats
+from attendance_tracker.pagination import encode_cursor
+from attendance_tracker.tests import CenterTestCase
+from courses.models import Course
+from students.models import Student
+from teachers.models import Teacher
+
+
+class StudentCalendarTests(CenterTestCase):
+    def details(self, month):
+        self.client.force_login(self.center)
+        return self.client.get(reverse('student-details', args=[self.students[0].pk]), {'month': month})
+
+    def test_chart_counts_archived_marks(self):
+        self.add_history(40)
+        archive.archive_before(timezone.localdate() - timedelta(days=10))
+        stats = StudentStats.objects.get(student=self.students[0])
+        self.assertEqual(stats.total, 40)
+        self.assertLess(Attendance.objects.filter(student=self.students[0]).count(), 40)
+        response = self.details(timezone.localdate().strftime('%Y-%m'))
+        self.assertEqual(response.context['chart_data']['values'], [stats.present, stats.absent])
+
+    def test_out_of_range_months(self):
+        for month in ('0001-01', '9999-12'):
+            with self.subTest(month=month):
+                self.assertEqual(self.details(month).status_code, 200)
+
+    def test_back_dated_mark_shows_in_cached_month(self):
+        day = timezone.localdate().replace(day=1) - timedelta(days=20)
+        month = day.strftime('%Y-%m')
+
+        def statuses():
+            weeks = self.details(month).context['calendar_weeks']
+            return {d: status for week in weeks for d, _, status in week if status is not None}
+
+        self.assertEqual(statuses(), {})
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(
+                student=self.students[0], course=self.course, lesson_date=day, status=True, center=self.center,
+            )
+        self.assertEqual(statuses(), {day: True})
+
+    def test_cached_month_is_per_viewer(self):
+        # A mark from another teacher's course: the admin sees it, the
+        # student's own teacher doesn't, whoever loads the month first.
+        other = Course.objects.create(
+            course_name='Art', course_teacher=Teacher.objects.create(
+                first_name='T', last_name='Two', phone_number='2', center=self.center,
+                user=User.objects.create(username='teacher-2'),
+            ),
+            course_time='12:00', days=self.course.days, description='', center=self.center,
+        )
+        day = timezone.localdate().replace(day=1) - timedelta(days=20)
+        Attendance.objects.create(student=self.students[0], course=other, lesson_date=day, status=True, center=self.center)
+
+        def statuses(user):
+            self.client.force_login(user)
+            response = self.client.get(reverse('student-details', args=[self.students[0].pk]), {'month': f'{day:%Y-%m}'})
+            return {d: status for week in response.context['calendar_weeks'] for d, _, status in week if status is not None}
+
+        for first, second in ((self.teacher.user, self.center), (self.center, self.teacher.user)):
+            with self.subTest(first=first.username):
+                with self.captureOnCommitCallbacks(execute=True):
+                    caching.bump(self.center.pk)
+                statuses(first)
+                self.assertEqual(statuses(self.center), {day: True})
+                self.assertEqual(statuses(self.teacher.user), {})
+
+
+class StudentListTests(CenterTestCase):
+    # More students than fit on one page, with rates and registration dates
+    # that tie, so the id tiebreak is exercised too.
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        today = timezone.localdate()
+        for i in range(30):
+            student = Student.objects.create(
+                first_name=f'N{i % 7}', last_name=f'L{i % 4}', phone_number='9', course=cls.course, gender='M',
+                center=cls.center, user=User.objects.create(username=f'list-{i}'),
+            )
+            Student.objects.filter(pk=student.pk).update(registration_date=today - timedelta(days=i % 3))
+        cls.add_history(4)
+
+    def expected(self, sort, order):
+        rates = dict(StudentStats.objects.values_list('student_id', 'rate'))
+        keys = {
+            'name': lambda s: (s.last_name, s.first_name, s.pk),
+            'rate': lambda s: (rates.get(s.pk, 0.0), s.pk),
+            'registered': lambda s: (s.registration_date, s.pk),
+        }
+        return sorted(Student.objects.all(), key=keys[sort], reverse=order == 'desc')
+
+    def page(self, **params):
+        response = self.client.get(reverse('student-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return [s.pk for s in response.context['students']], response.context['next_cursor']
+
+    def test_pages_follow_the_sort(self):
+        self.client.force_login(self.center)
+        for sort in ('name', 'rate', 'registered'):
+            for order in ('asc', 'desc'):
+                with self.subTest(sort=sort, order=order):
+                    seen, cursor = self.page(sort=sort, order=order)
+                    while cursor:
+                        rows, cursor = self.page(sort=sort, order=order, cursor=cursor)
+                        seen += rows
+                    self.assertEqual(seen, [s.pk for s in self.expected(sort, order)])
+
+    def test_tampered_cursor_reads_the_first_page(self):
+        self.client.force_login(self.center)
+        for sort in ('name', 'rate', 'registered'):
+            first, _ = self.page(sort=sort)
+            for values in (['a', 'b'], ['a', 'b', 'c'], [None, None, None], [[], {}, 1], 'x'):
+                with self.subTest(sort=sort, values=values):
+                    self.assertEqual(self.page(sort=sort, cursor=encode_cursor(values))[0], first)
@@ -1,72 +1,62 @@
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.db.models import ExpressionWrapper, FloatField, F, Count, Q
-from django.db.models.functions import NullIf
+from django.db.models import F
+from django.db.models.functions import Coalesce
 from django.shortcuts import render, redirect, get_object_or_404
 from django.utils import timezone
-from django.contrib import messages
 
+from accounts.decorators import role_required
+from attendance_tracker import caching
+from attendance_tracker.analytics import with_stats
+from attendance_tracker.exports import export_students
+from attendance_tracker.pagination import keyset_page, list_page
 from attendance_tracker.models import Attendance
-from courses.models import Course
+from config.routers import replica_reads
+from courses.models import WEEKDAYS, Course
 from students.models import Student
 
 import calendar
-from collections import defaultdict
-from datetime import date
-
-import csv
-from django.http import HttpResponse
-
-def export_to_csv(filename, headers, rows):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(headers)
-    for row in rows:
-        writer.writerow(row)
-    return response
-
-def no_permission(request):
-    messages.error(request, 'You do not have a permission.')
-    return redirect('dashboard')
-
-def attendance_annotate(qs):
-    return qs.annotate(
-        total=Count('attendance'),
-        present=Count('attendance', filter=Q(attendance__status=True)),
-    ).annotate(
-        attendance_rate=ExpressionWrapper(
-            100.0 * F('present') / NullIf(F('total'), 0),
-            output_field=FloatField()
-        )
-    )
+from datetime import datetime, timedelta
+
+RECORDS_PAGE_SIZE = 20
+
+CALENDAR_TIMEOUT = 60 * 60 * 24 * 30
+MIN_YEAR, MAX_YEAR = 1900, 9998
+
+LIST_SORTS = {
+    'name': ('last_name', 'first_name', 'id'),
+    'rate': ('attendance_rate', 'id'),
+    'registered': ('registration_date', 'id'),
+}
 
 @login_required
+@role_required('admin', 'teacher')
+@replica_reads
 def students_list(request):
-    if hasattr(request.user, 'student_user'):
-        return no_permission(request)
+    students = Student.objects.all()
 
-    role = "admin"
-    students = attendance_annotate(Student.objects.all())
-
-    if hasattr(request.user, 'teacher_user'):
-        role = "teacher"
+    if request.role == 'teacher':
         students = students.filter(course__course_teacher__user=request.user)
     else:
         students = students.filter(center=request.user)
 
     if 'download-csv' in request.path:
-        headers = ["First Name", "Last Name", "Course", "Phone Number", "Registration Date", "Gender"]
-        rows = [[s.first_name, s.last_name, s.course, s.phone_number, s.registration_date, s.gender] for s in students]
-        return export_to_csv('students', headers, rows)
+        return export_students(students)
 
-    return render(request, "students/students_list.html", {"students": students, "role": role})
+    students = students.select_related('course').annotate(attendance_rate=Coalesce(F('stats__rate'), 0.0))
+    students, next_cursor, state = list_page(
+        students, request.GET, LIST_SORTS, 'name', search=('first_name', 'last_name', 'phone_number'),
+    )
+    return render(request, "students/students_list.html", {
+        "students": students,
+        "role": request.role,
+        "next_cursor": next_cursor,
+        **state,
+    })
 
 @login_required
+@role_required('admin')
 def add_student(request):
-    if hasattr(request.user, 'teacher_user') or hasattr(request.user, 'student_user'):
-        return no_permission(request)
     data = {
         "courses": Course.objects.filter(center=request.user),
     }
@@ -86,10 +76,8 @@ def add_student(request):
     return render(request, "students/add_student.html", data)
 
 @login_required
+@role_required('admin')
 def edit_student(request, id):
-    if hasattr(request.user, 'teacher_user') or hasattr(request.user, 'student_user'):
-        return no_permission(request)
-
     if request.method == "POST":
         student = get_object_or_404(Student, pk=id, center=request.user)
         student.first_name = request.POST.get('first_name')
@@ -108,10 +96,8 @@ def edit_student(request, id):
     return render(request, "students/edit_student.html", data)
 
 @login_required
+@role_required('admin')
 def delete_confirmation_student(request, id):
-    if hasattr(request.user, 'teacher_user') or hasattr(request.user, 'student_user'):
-        return no_permission(request)
-
     student = get_object_or_404(Student, pk=id, center=request.user)
 
     data = {
@@ -120,75 +106,103 @@ def delete_confirmation_student(request, id):
     return render(request, "students/delete_confirmation_student.html", data)
 
 @login_required
+@role_required('admin')
 def delete_student(request, id):
-    if hasattr(request.user, 'teacher_user') or hasattr(request.user, 'student_user'):
-        return no_permission(request)
-
     student = get_object_or_404(Student, pk=id, center=request.user).delete()
     return redirect('student-list')
 
-@login_required
-def student_details(request, id):
-    if hasattr(request.user, 'teacher_user'):
-        student = attendance_annotate(Student.objects.filter(course__course_teacher__user=request.user)).get(id=id)
-        attendances = Attendance.objects.filter(student=student, course__course_teacher__user=request.user)
-        raw_counts = Attendance.objects.filter(student_id=id, course__course_teacher__user=request.user).values('status').annotate(count=Count('id'))
-    else:
-        student = attendance_annotate(Student.objects.filter(center=request.user)).get(id=id)
-        attendances = Attendance.objects.filter(student=student, center=request.user)
-        raw_counts = Attendance.objects.filter(student_id=id, center=request.user).values('status').annotate(count=Count('id'))
+def parse_month(value):
+    try:
+        month = datetime.strptime(value, "%Y-%m").date()
+    except (TypeError, ValueError):
+        return timezone.localdate().replace(day=1)
+    # Keep the previous and next month links within what date can hold.
+    return month.replace(year=min(max(month.year, MIN_YEAR), MAX_YEAR))
+
+def month_calendar(student, attendances, month_start, viewer="all"):
+    """Calendar weeks of (day, is_course_day, status) for the month starting at `month_start`.
 
-    today = date.today()
-    year, month = today.year, today.month
+    `viewer` names the scope `attendances` was filtered to, so grids built
+    for one role are never served to another.
+    """
     cal = calendar.Calendar(firstweekday=0)
-    month_days = list(cal.itermonthdates(year, month))
+    month_days = list(cal.itermonthdates(month_start.year, month_start.month))
+    course_weekdays = {WEEKDAYS.index(d) for d in student.course.days if d in WEEKDAYS}
 
-    attendance_map = {a.time.date(): a.status for a in attendances}
+    def build():
+        attendance_map = dict(
+            attendances.filter(lesson_date__range=(month_days[0], month_days[-1])).values_list('lesson_date', 'status')
+        )
+        calendar_weeks = []
+        for i in range(0, len(month_days), 7):
+            week = []
+            for day in month_days[i:i+7]:
+                is_course_day = day.weekday() in course_weekdays and day.month == month_start.month
+                status = attendance_map.get(day) if is_course_day else None
+                week.append((day, is_course_day, status))
+            calendar_weeks.append(week)
+        return calendar_weeks
+
+    # Only finished months are cached: today's classes may still be marked.
+    # Back-dated marks, archiving and course changes bump the center version.
+    if month_days[-1] >= timezone.localdate():
+        return build()
+    key = f"student-calendar:{student.pk}:{viewer}:{month_start:%Y-%m}"
+    return caching.get_or_compute(student.center_id, key, build, timeout=CALENDAR_TIMEOUT)
 
-    day_map = {
-        'Mon': 0, 'Tue': 1, 'Wed': 2, 'Thu': 3,
-        'Fri': 4, 'Sat': 5, 'Sun': 6,
-    }
-    raw_days = student.course.days
-    target_weekdays = [day_map[d] for d in raw_days]
-
-    # Build calendar grid
-    calendar_weeks = []
-    for i in range(0, len(month_days), 7):
-        week = []
-        for day in month_days[i:i+7]:
-            is_course_day = day.weekday() in target_weekdays and day.month == month
-            status = attendance_map.get(day) if is_course_day else None
-            week.append((day, is_course_day, status))
-        calendar_weeks.append(week)
-
-    counts = defaultdict(int)
-    for item in raw_counts:
-        counts[item['status']] = item['count']
+@login_required
+def student_details(request, id=None):
+    # A teacher only sees the marks of their own courses; everyone else
+    # sees all of the student's marks.
+    viewer = "all"
+    if request.role == 'teacher':
+        students = Student.objects.filter(course__course_teacher__user=request.user)
+        records = Attendance.objects.filter(course__course_teacher__user=request.user)
+        viewer = f"teacher-{request.user.pk}"
+    elif request.role == 'student':
+        students = Student.objects.filter(user=request.user)
+        records = Attendance.objects.all()
+    else:
+        students = Student.objects.filter(center=request.user)
+        records = Attendance.objects.filter(center=request.user)
+
+    students = with_stats(students).select_related('course', 'stats')
+    student = get_object_or_404(students, pk=id) if id is not None else get_object_or_404(students)
+    attendances = records.filter(student=student)
 
+    month_start = parse_month(request.GET.get('month'))
+    current_month = timezone.localdate().replace(day=1)
+    previous_month = (month_start - timedelta(days=1)).replace(day=1)
+    next_month = (month_start + timedelta(days=31)).replace(day=1)
+
+    # Lifetime counts, archive included, like the rate beside the chart.
+    stats = getattr(student, 'stats', None)
     chart_data = {
         "labels": ["Present", "Absent"],
-        "values": [counts[True], counts[False]],
+        "values": [stats.present, stats.absent] if stats else [0, 0],
     }
-    role = "admin"
-    if hasattr(request.user, 'teacher_user'):
-        role = "teacher"
-    elif hasattr(request.user, 'student_user'):
-        role = "student"
+    attendance_records, next_cursor = keyset_page(
+        attendances.select_related('course'), ('time', 'id'), cursor=request.GET.get('cursor'), size=RECORDS_PAGE_SIZE,
+    )
     data = {
         "student": student,
-        "attendances": attendances,
-        "latest_status": attendances.order_by('-time')[:1],
-        "calendar_weeks": calendar_weeks,
-        "month_name": today.strftime("%B"),
-        "year": year,
-        "today": today,
+        "latest_status": attendances.order_by('-time', '-id')[:1],
+        "calendar_weeks": month_calendar(student, attendances, month_start, viewer),
+        "month_start": month_start,
+        "month_name": month_start.strftime("%B"),
+        "year": month_start.year,
+        "previous_month": previous_month.strftime("%Y-%m"),
+        "next_month": next_month.strftime("%Y-%m") if month_start < current_month else None,
+        "today": timezone.localdate(),
         "chart_data": chart_data,
-        "attendance_records": attendances,
-        "role": role
+        "attendance_records": attendance_records,
+        "next_cursor": next_cursor,
+        "role": request.role
     }
     return render(request, "students/student_details.html", data)
 
 @login_required
 def student_dashboard(request):
-    return student_details(request, Student.objects.get(user=request.user).id)
\ No newline at end of file
+    if request.role != 'student':
+        return redirect('dashboard')
+    return student_details(request)
@@ -0,0 +1,16 @@
+from django.urls import reverse
+
+from attendance_tracker.pagination import encode_cursor
+from attendance_tracker.tests import CenterTestCase
+from teachers.views import LIST_SORTS
+
+
+class TeacherListTests(CenterTestCase):
+    def test_tampered_cursor_reads_the_first_page(self):
+        self.client.force_login(self.center)
+        for sort in LIST_SORTS:
+            for values in (['a', 'b'], ['a', 'b', 'c'], [None, 1, 1]):
+                with self.subTest(sort=sort, values=values):
+                    response = self.client.get(reverse('teachers-list'), {'sort': sort, 'cursor': encode_cursor(values)})
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(list(response.context['teachers']), [self.teacher])
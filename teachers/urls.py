@@ -1,15 +1,21 @@
+from django.conf import settings
 from django.urls import path
 
+from accounts.views import import_users
+
 from .views import *
 
+dashboard_view = teacher_dashboard_async if settings.ASYNC_DASHBOARDS else teacher_dashboard
+
 urlpatterns = [
     path('list/', teachers_list, name='teachers-list'),
     path('list/download-csv/', teachers_list, name='teacher-list-csv'),
     path('add/', add_teacher, name='add-teacher'),
+    path('import/', import_users, {'kind': 'teachers'}, name='import-teachers'),
     path('edit/<int:id>/', edit_teacher, name='edit-teacher'),
     path('delete/<int:id>/confirmation/', delete_confirmation_teacher, name='delete-confirmation-teacher'),
     path('delete/<int:id>/', delete_teacher, name='delete-teacher'),
     path('details/<int:id>/', teacher_details, name='teacher-details'),
-    path('', teacher_dashboard, name='teacher-dashboard'),
-    path('<int:a>/', teacher_dashboard, name='teacher-dashboard'),
+    path('', dashboard_view, name='teacher-dashboard'),
+    path('<int:a>/', dashboard_view, name='teacher-dashboard'),
 ]
\ No newline at end of file